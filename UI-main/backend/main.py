@@ -4,8 +4,14 @@ import io
 import re
 import csv
 import json
+import queue
+import asyncio
+import atexit
+import logging
+import logging.handlers
 import time
-import traceback
+import random
+import hashlib
 import warnings
 import requests
 from typing import List, Optional, Dict, Any
@@ -19,6 +25,7 @@ from atlassian import Confluence
 import google.generativeai as genai
 from bs4 import BeautifulSoup
 from io import BytesIO
+from pathlib import Path
 import difflib
 import base64
 from datetime import datetime
@@ -29,6 +36,19 @@ from slack_utils import send_slack_message
 # Load environment variables
 load_dotenv()
 
+# Logging: records are handed to a queue and written by a listener thread,
+# so handlers never block the event loop; debug messages are formatted lazily
+logger = logging.getLogger("backend")
+logger.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+logger.propagate = False
+_log_queue = queue.SimpleQueue()
+logger.addHandler(logging.handlers.QueueHandler(_log_queue))
+_log_handler = logging.StreamHandler()
+_log_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+_log_listener = logging.handlers.QueueListener(_log_queue, _log_handler)
+_log_listener.start()
+atexit.register(_log_listener.stop)
+
 app = FastAPI(title="Confluence AI Assistant API")
 
 # Add CORS middleware
@@ -120,16 +140,12 @@ class MeetingNotesRequest(BaseModel):
     confluence_space_key: Optional[str] = None
 
 # Helper functions
+# Every emoji lies outside latin-1, so one precompiled pass drops them together with
+# anything else the core PDF fonts cannot encode
+NON_LATIN1_RE = re.compile(r"[^\x00-\xff]+")
+
 def remove_emojis(text):
-    emoji_pattern = re.compile(
-        "["
-        u"\U0001F600-\U0001F64F"
-        u"\U0001F300-\U0001F5FF"
-        u"\U0001F680-\U0001F6FF"
-        u"\U0001F1E0-\U0001F1FF"
-        "]+", flags=re.UNICODE)
-    no_emoji = emoji_pattern.sub(r'', text)
-    return no_emoji.encode('latin-1', 'ignore').decode('latin-1')
+    return NON_LATIN1_RE.sub('', text)
 
 def clean_html(html_content):
     """Clean HTML content and extract only the essential text/code"""
@@ -176,15 +192,28 @@ def init_confluence():
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Confluence initialization failed: {str(e)}")
 
+def iter_space_pages(confluence, space_key, batch=100):
+    """Yield every page in a space, one batch at a time, instead of stopping at the first batch"""
+    start = 0
+    while True:
+        batch_pages = confluence.get_all_pages_from_space(space=space_key, start=start, limit=batch)
+        if not batch_pages:
+            break
+        yield from batch_pages
+        # Advance by what came back, since the server may cap the batch below the requested size
+        start += len(batch_pages)
+
 # Export functions
 def create_pdf(text):
     pdf = FPDF()
     pdf.add_page()
     pdf.set_auto_page_break(auto=True, margin=15)
     pdf.set_font("Arial", size=12)
-    for line in text.split('\n'):
-        pdf.multi_cell(0, 10, line)
-    return io.BytesIO(pdf.output(dest='S').encode('latin1'))
+    # One multi_cell call lays out the whole text and honours its newlines itself
+    pdf.multi_cell(0, 10, remove_emojis(text))
+    pdf_output = pdf.output(dest='S')
+    # PyFPDF returns a latin-1 str, fpdf2 returns bytes
+    return io.BytesIO(pdf_output.encode('latin-1') if isinstance(pdf_output, str) else pdf_output)
 
 def create_docx(text):
     doc = Document()
@@ -276,7 +305,7 @@ async def get_pages(space_key: Optional[str] = None):
         confluence = init_confluence()
         space_key = auto_detect_space(confluence, space_key)
         
-        pages = confluence.get_all_pages_from_space(space=space_key, start=0, limit=100)
+        pages = list(iter_space_pages(confluence, space_key))
         page_titles = [p["title"] for p in pages]
         
         return {"pages": page_titles}
@@ -294,7 +323,7 @@ async def ai_powered_search(request: SearchRequest, req: Request):
         space_key = auto_detect_space(confluence, getattr(request, 'space_key', None))
 
         # Get the single page by title
-        pages = confluence.get_all_pages_from_space(space=space_key, start=0, limit=100)
+        pages = list(iter_space_pages(confluence, space_key))
         selected_page = next((p for p in pages if p["title"] == request.page_title), None)
         if not selected_page:
             raise HTTPException(status_code=400, detail="Page not found")
@@ -335,7 +364,7 @@ async def video_summarizer(request: VideoRequest, req: Request):
     space_key = auto_detect_space(confluence, getattr(request, 'space_key', None))
 
     # Get page info
-    pages = confluence.get_all_pages_from_space(space=space_key, start=0, limit=100)
+    pages = list(iter_space_pages(confluence, space_key))
     selected_page = next((p for p in pages if p["title"] == request.page_title), None)
     if not selected_page:
         raise HTTPException(status_code=400, detail="Page not found")
@@ -401,7 +430,9 @@ async def video_summarizer(request: VideoRequest, req: Request):
         if transcript_response.status_code != 200:
             raise HTTPException(status_code=500, detail="Failed to submit audio for transcription")
         transcript_id = transcript_response.json()["id"]
-        # Poll for completion
+        # Poll for completion with bounded exponential backoff and jitter
+        poll_delay = 0.25
+        poll_deadline = time.monotonic() + 600
         while True:
             polling_response = requests.get(
                 f"https://api.assemblyai.com/v2/transcript/{transcript_id}",
@@ -414,7 +445,10 @@ async def video_summarizer(request: VideoRequest, req: Request):
                 break
             elif status == "error":
                 raise HTTPException(status_code=500, detail="Transcription failed")
-            time.sleep(3)
+            if time.monotonic() >= poll_deadline:
+                raise HTTPException(status_code=504, detail="Timed out waiting for transcription")
+            await asyncio.sleep(poll_delay + random.uniform(0, poll_delay * 0.25))
+            poll_delay = min(poll_delay * 2, 8.0)
         transcript_data = polling_response.json()
         transcript_text = transcript_data.get("text", "")
         if not transcript_text:
@@ -487,7 +521,7 @@ async def code_assistant(request: CodeRequest, req: Request):
         space_key = auto_detect_space(confluence, getattr(request, 'space_key', None))
         
         # Get page content
-        pages = confluence.get_all_pages_from_space(space=space_key, start=0, limit=100)
+        pages = list(iter_space_pages(confluence, space_key))
         selected_page = next((p for p in pages if p["title"] == request.page_title), None)
         
         if not selected_page:
@@ -580,9 +614,10 @@ async def impact_analyzer(request: ImpactRequest, req: Request):
         space_key = auto_detect_space(confluence, getattr(request, 'space_key', None))
         
         # Get pages
-        pages = confluence.get_all_pages_from_space(space=space_key, start=0, limit=100)
-        old_page = next((p for p in pages if p["title"] == request.old_page_title), None)
-        new_page = next((p for p in pages if p["title"] == request.new_page_title), None)
+        pages = list(iter_space_pages(confluence, space_key))
+        pages_by_title = {p["title"]: p for p in pages}
+        old_page = pages_by_title.get(request.old_page_title)
+        new_page = pages_by_title.get(request.new_page_title)
         
         if not old_page or not new_page:
             raise HTTPException(status_code=400, detail="One or both pages not found")
@@ -737,7 +772,7 @@ Answer:"""
         # Agentic Jira integration: create ticket if risk is high
         if result["risk_level"] == "high":
             try:
-                print("Attempting to create Jira issue for high risk...")
+                logger.info("Attempting to create Jira issue for high risk...")
                 summary = f"High Risk Change Detected: {request.old_page_title} → {request.new_page_title}"
                 description = (
                     f"Impact Analysis:\n{impact_text}\n\n"
@@ -746,13 +781,13 @@ Answer:"""
                     f"Diff:\n{full_diff_text[:1000]}..."  # Truncate if too long
                 )
                 jira_result = create_jira_issue(summary, description)
-                print(f"Jira issue created: {jira_result}")
+                logger.info("Jira issue created: %s", jira_result)
                 result["jira_issue"] = jira_result.get("key")
                 jira_url = None
                 if jira_result.get("key"):
                     jira_url = f"{os.getenv('JIRA_BASE_URL')}/browse/{jira_result['key']}"
             except Exception as jira_exc:
-                print(f"Jira issue creation failed: {jira_exc}")
+                logger.warning("Jira issue creation failed: %s", jira_exc)
                 result["jira_error"] = str(jira_exc)
                 jira_url = None
             # Send Slack notification
@@ -765,9 +800,9 @@ Answer:"""
                     + (f"*Jira Ticket:* <{jira_url}|{jira_result.get('key')}>\n" if jira_url else "")
                 )
                 send_slack_message(slack_message)
-                print("Slack notification sent.")
+                logger.info("Slack notification sent.")
             except Exception as slack_exc:
-                print(f"Slack notification failed: {slack_exc}")
+                logger.warning("Slack notification failed: %s", slack_exc)
                 result["slack_error"] = str(slack_exc)
 
         return result
@@ -784,21 +819,63 @@ import os
 import json
 from datetime import datetime
 import uuid
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # CircleCI API configuration
 CIRCLECI_API_TOKEN = os.getenv('CIRCLECI_API_TOKEN', 'your-circleci-token')
 CIRCLECI_PROJECT_SLUG = os.getenv('CIRCLECI_PROJECT_SLUG', 'github/KHarish15/finalmain')
 CIRCLECI_API_BASE = "https://circleci.com/api/v2"
 
+# Shared session so consecutive CircleCI API calls reuse pooled keep-alive connections.
+# Retry only covers idempotent requests (urllib3 never retries the pipeline POST).
+circleci_session = requests.Session()
+circleci_session.mount("https://", HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=8,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[502, 503, 504])
+))
+
+# Body of the "Live Status" page posted to Confluence when a pipeline is triggered
+CIRCLECI_STATUS_PAGE_TEMPLATE = '''
+## 🚀 CircleCI Pipeline Triggered - Live Status
+
+### Build Information
+- **Build Number**: #{build_number}
+- **Pipeline ID**: `{pipeline_id}`
+- **Branch**: {branch}
+- **Triggered At**: {triggered_at}
+- **Triggered By**: Test Support Tool
+
+### Live Links
+- **🔗 CircleCI Dashboard**: [View Live Build](https://app.circleci.com/pipelines/{project_slug}/{build_number})
+- **📊 Pipeline Details**: [Pipeline #{build_number}](https://app.circleci.com/pipelines/{pipeline_id})
+
+### Current Status
+🔄 **Status**: Pipeline triggered, tests starting...
+
+### What's Happening Now
+1. **Test Suite Execution**: Running comprehensive test suite
+2. **AI Analysis**: Analyzing test results with AI
+3. **Coverage Report**: Generating test coverage reports
+4. **Confluence Post**: Will post final results here
+
+### Real-time Updates
+This page will be updated as the pipeline progresses. Refresh to see latest status.
+
+---
+*Generated automatically by Test Support Tool with CircleCI integration*
+'''
+
 def trigger_circleci_pipeline(branch="main", parameters=None, code_content=None, test_content=None, code_filename=None, test_filename=None):
     """Trigger a new CircleCI pipeline with file content"""
     try:
         # Check if CircleCI is properly configured
         if CIRCLECI_API_TOKEN == 'your-circleci-token' or not CIRCLECI_API_TOKEN:
-            print("⚠️ CircleCI not configured - skipping pipeline trigger")
-            print("📋 To enable CircleCI integration, set these environment variables:")
-            print("   CIRCLECI_API_TOKEN=your-actual-circleci-token")
-            print("   CIRCLECI_PROJECT_SLUG=github/your-username/your-repo")
+            logger.warning(
+                "⚠️ CircleCI not configured - skipping pipeline trigger. "
+                "Set CIRCLECI_API_TOKEN and CIRCLECI_PROJECT_SLUG to enable the integration."
+            )
             return {
                 "success": False,
                 "error": "CircleCI not configured. Please set CIRCLECI_API_TOKEN and CIRCLECI_PROJECT_SLUG environment variables.",
@@ -806,9 +883,10 @@ def trigger_circleci_pipeline(branch="main", parameters=None, code_content=None,
             }
         
         if CIRCLECI_PROJECT_SLUG == 'github/your-username/your-repo':
-            print("⚠️ CircleCI project slug not configured - skipping pipeline trigger")
-            print("📋 To enable CircleCI integration, set CIRCLECI_PROJECT_SLUG environment variable:")
-            print("   CIRCLECI_PROJECT_SLUG=github/your-username/your-repo")
+            logger.warning(
+                "⚠️ CircleCI project slug not configured - skipping pipeline trigger. "
+                "Set CIRCLECI_PROJECT_SLUG to enable the integration."
+            )
             return {
                 "success": False,
                 "error": "CircleCI project slug not configured. Please set CIRCLECI_PROJECT_SLUG environment variable.",
@@ -859,15 +937,13 @@ def trigger_circleci_pipeline(branch="main", parameters=None, code_content=None,
             truncated_code = truncate_for_circleci(code_content)
             code_b64 = base64.b64encode(truncated_code.encode()).decode()
             
-            print(f"🔍 DEBUG: Original code content size: {len(code_content)} chars")
-            print(f"🔍 DEBUG: Truncated code content size: {len(truncated_code)} chars")
-            print(f"🔍 DEBUG: Code base64 size: {len(code_b64)} chars")
+            logger.debug("Original code content size: %s chars", len(code_content))
+            logger.debug("Truncated code content size: %s chars", len(truncated_code))
+            logger.debug("Code base64 size: %s chars", len(code_b64))
             
             # Final safety check
             if len(code_b64) > 450:  # Leave more buffer for CircleCI's 512 limit
-                print(f"⚠️ Code content still too large after truncation")
-                print(f"📄 Code base64 size: {len(code_b64)} chars")
-                print(f"📋 CircleCI limit: 512 chars per parameter")
+                logger.warning("⚠️ Code content still too large after truncation: %d base64 chars (CircleCI limit: 512)", len(code_b64))
                 
                 return {
                     "success": False,
@@ -885,20 +961,18 @@ def trigger_circleci_pipeline(branch="main", parameters=None, code_content=None,
             if test_content:
                 # Estimate base64 size before encoding
                 estimated_b64_size = int(len(test_content) * 1.37)  # Base64 is ~37% larger
-                print(f"🔍 DEBUG: Estimated test base64 size: {estimated_b64_size} chars")
+                logger.debug("Estimated test base64 size: %s chars", estimated_b64_size)
                 
                 # Truncate test content if needed
                 truncated_test = truncate_for_circleci(test_content)
                 test_b64 = base64.b64encode(truncated_test.encode()).decode()
                 
-                print(f"🔍 DEBUG: Original test content size: {len(test_content)} chars")
-                print(f"🔍 DEBUG: Truncated test content size: {len(truncated_test)} chars")
-                print(f"🔍 DEBUG: Test base64 size: {len(test_b64)} chars")
+                logger.debug("Original test content size: %s chars", len(test_content))
+                logger.debug("Truncated test content size: %s chars", len(truncated_test))
+                logger.debug("Test base64 size: %s chars", len(test_b64))
                 
                 if len(test_b64) > 450:  # More conservative buffer for CircleCI's 512 limit
-                    print(f"⚠️ Test content still too large after truncation")
-                    print(f"🧪 Test base64 size: {len(test_b64)} chars")
-                    print(f"📋 CircleCI limit: 512 chars per parameter")
+                    logger.warning("⚠️ Test content still too large after truncation: %d base64 chars (CircleCI limit: 512)", len(test_b64))
                     
                     return {
                         "success": False,
@@ -908,72 +982,50 @@ def trigger_circleci_pipeline(branch="main", parameters=None, code_content=None,
                 
                 payload["parameters"]["test_content"] = test_b64
                 payload["parameters"]["test_filename"] = test_filename or "input_file.py"
-                print(f"🚀 Triggering CircleCI pipeline with code and test content")
-                print(f"📄 Code file: {code_filename or 'python_sample.py'}")
-                print(f"🧪 Test file: {test_filename or 'input_file.py'}")
+                logger.info("🚀 Triggering CircleCI pipeline with code and test content")
+                logger.info("📄 Code file: %s", code_filename or 'python_sample.py')
+                logger.info("🧪 Test file: %s", test_filename or 'input_file.py')
             else:
-                print(f"🚀 Triggering CircleCI pipeline with code content only")
-                print(f"📄 Code file: {code_filename or 'python_sample.py'}")
-                print(f"⚠️ No test content - CircleCI will create basic test")
+                logger.info("🚀 Triggering CircleCI pipeline with code content only")
+                logger.info("📄 Code file: %s", code_filename or 'python_sample.py')
+                logger.warning("⚠️ No test content - CircleCI will create basic test")
         else:
-            print(f"🚀 Triggering CircleCI pipeline for branch: {branch}")
-            print(f"⚠️ No code content provided - cannot proceed")
+            logger.info("🚀 Triggering CircleCI pipeline for branch: %s", branch)
+            logger.warning("⚠️ No code content provided - cannot proceed")
             return {
                 "success": False,
                 "error": "No code content provided. Please ensure code content is available.",
                 "setup_required": False
             }
         
-        print(f"📋 Payload: {payload}")
-        print(f"🔗 CircleCI Dashboard URL: https://app.circleci.com/pipelines/{CIRCLECI_PROJECT_SLUG}")
+        logger.debug("📋 Payload: %s", payload)
+        logger.info("🔗 CircleCI Dashboard URL: https://app.circleci.com/pipelines/%s", CIRCLECI_PROJECT_SLUG)
         
-        response = requests.post(url, headers=headers, json=payload, timeout=30)
+        response = circleci_session.post(url, headers=headers, json=payload, timeout=30)
         
         if response.status_code == 201:
             pipeline_data = response.json()
             pipeline_id = pipeline_data.get('id')
             build_number = pipeline_data.get('number')
             
-            print(f"✅ CircleCI pipeline triggered successfully!")
-            print(f"📋 Pipeline ID: {pipeline_id}")
-            print(f"🔢 Build Number: {build_number}")
-            print(f"🔗 Live Dashboard: https://app.circleci.com/pipelines/{CIRCLECI_PROJECT_SLUG}/{build_number}")
-            print(f"📊 Build URL: https://app.circleci.com/pipelines/{pipeline_id}")
+            logger.info("✅ CircleCI pipeline triggered successfully!")
+            logger.info("📋 Pipeline ID: %s", pipeline_id)
+            logger.info("🔢 Build Number: %s", build_number)
+            logger.info("🔗 Live Dashboard: https://app.circleci.com/pipelines/%s/%s", CIRCLECI_PROJECT_SLUG, build_number)
+            logger.info("📊 Build URL: https://app.circleci.com/pipelines/%s", pipeline_id)
             
             # Send immediate notification to Confluence about the trigger
             try:
                 confluence_notification = {
                     'space_key': 'TEST',  # Default space key
                     'page_title': f'CircleCI Build #{build_number} - Live Status',
-                    'content': f'''
-## 🚀 CircleCI Pipeline Triggered - Live Status
-
-### Build Information
-- **Build Number**: #{build_number}
-- **Pipeline ID**: `{pipeline_id}`
-- **Branch**: {branch}
-- **Triggered At**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-- **Triggered By**: Test Support Tool
-
-### Live Links
-- **🔗 CircleCI Dashboard**: [View Live Build](https://app.circleci.com/pipelines/{CIRCLECI_PROJECT_SLUG}/{build_number})
-- **📊 Pipeline Details**: [Pipeline #{build_number}](https://app.circleci.com/pipelines/{pipeline_id})
-
-### Current Status
-🔄 **Status**: Pipeline triggered, tests starting...
-
-### What's Happening Now
-1. **Test Suite Execution**: Running comprehensive test suite
-2. **AI Analysis**: Analyzing test results with AI
-3. **Coverage Report**: Generating test coverage reports
-4. **Confluence Post**: Will post final results here
-
-### Real-time Updates
-This page will be updated as the pipeline progresses. Refresh to see latest status.
-
----
-*Generated automatically by Test Support Tool with CircleCI integration*
-'''
+                    'content': CIRCLECI_STATUS_PAGE_TEMPLATE.format_map({
+                        'build_number': build_number,
+                        'pipeline_id': pipeline_id,
+                        'branch': branch,
+                        'triggered_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                        'project_slug': CIRCLECI_PROJECT_SLUG
+                    })
                 }
                 
                 # Post immediate notification
@@ -984,12 +1036,12 @@ This page will be updated as the pipeline progresses. Refresh to see latest stat
                         title=confluence_notification['page_title'],
                         body=confluence_notification['content']
                     )
-                    print(f"📄 Immediate notification posted to Confluence")
+                    logger.info("📄 Immediate notification posted to Confluence")
                 except Exception as e:
-                    print(f"⚠️ Could not post immediate notification: {e}")
+                    logger.warning("⚠️ Could not post immediate notification: %s", e)
                     
             except Exception as e:
-                print(f"⚠️ Notification setup failed: {e}")
+                logger.warning("⚠️ Notification setup failed: %s", e)
             
             return {
                 "success": True,
@@ -1002,7 +1054,7 @@ This page will be updated as the pipeline progresses. Refresh to see latest stat
             }
         else:
             error_msg = f"CircleCI API returned {response.status_code}: {response.text}"
-            print(f"❌ Failed to trigger CircleCI pipeline: {error_msg}")
+            logger.error("❌ Failed to trigger CircleCI pipeline: %s", error_msg)
             
             # Provide helpful error messages
             if response.status_code == 401:
@@ -1021,7 +1073,7 @@ This page will be updated as the pipeline progresses. Refresh to see latest stat
             }
             
     except Exception as e:
-        print(f"❌ Error triggering CircleCI pipeline: {str(e)}")
+        logger.error("❌ Error triggering CircleCI pipeline: %s", e)
         return {
             "success": False,
             "error": str(e),
@@ -1037,7 +1089,7 @@ def get_circleci_pipeline_status(pipeline_id):
             "Circle-Token": CIRCLECI_API_TOKEN
         }
         
-        response = requests.get(url, headers=headers, timeout=30)
+        response = circleci_session.get(url, headers=headers, timeout=30)
         
         if response.status_code == 200:
             pipeline_data = response.json()
@@ -1066,7 +1118,7 @@ def get_circleci_workflow_status(pipeline_id):
             "Circle-Token": CIRCLECI_API_TOKEN
         }
         
-        response = requests.get(url, headers=headers, timeout=30)
+        response = circleci_session.get(url, headers=headers, timeout=30)
         
         if response.status_code == 200:
             workflows_data = response.json()
@@ -1103,16 +1155,15 @@ async def trigger_circleci_endpoint(request: Request):
         
         if result['success']:
             # Log the trigger for audit trail
-            print(f"📊 CircleCI Pipeline Triggered:")
-            print(f"   Pipeline ID: {result['pipeline_id']}")
-            print(f"   Branch: {branch}")
-            print(f"   Parameters: {parameters}")
-            print(f"   Timestamp: {datetime.now().isoformat()}")
+            logger.info(
+                "📊 CircleCI Pipeline Triggered: pipeline_id=%s branch=%s parameters=%s",
+                result['pipeline_id'], branch, parameters
+            )
         
         return result
         
     except Exception as e:
-        print(f"❌ Error in trigger-circleci endpoint: {str(e)}")
+        logger.error("❌ Error in trigger-circleci endpoint: %s", e)
         return {
             "success": False,
             "error": str(e)
@@ -1122,11 +1173,11 @@ async def trigger_circleci_endpoint(request: Request):
 async def get_circleci_status(pipeline_id: str):
     """Get CircleCI pipeline and workflow status"""
     try:
-        # Get pipeline status
-        pipeline_status = get_circleci_pipeline_status(pipeline_id)
-        
-        # Get workflow status
-        workflow_status = get_circleci_workflow_status(pipeline_id)
+        # Pipeline and workflow lookups are independent, so run them concurrently
+        pipeline_status, workflow_status = await asyncio.gather(
+            asyncio.to_thread(get_circleci_pipeline_status, pipeline_id),
+            asyncio.to_thread(get_circleci_workflow_status, pipeline_id)
+        )
         
         return {
             "pipeline": pipeline_status,
@@ -1149,42 +1200,55 @@ from fastapi import APIRouter, Request
 async def test_support(request: TestRequest, req: Request):
     """Test Support Tool functionality with CircleCI integration"""
     try:
-        api_key = get_actual_api_key_from_identifier(req.headers.get('x-api-key'))
-        genai.configure(api_key=api_key)
-        ai_model = genai.GenerativeModel("models/gemini-1.5-flash-8b-latest")
-        print(f"Test support request: {request}")  # Debug log
+        logger.debug("Test support request: %s", request)
         confluence = init_confluence()
         space_key = auto_detect_space(confluence, getattr(request, 'space_key', None))
-        
-        # Get code page
-        pages = confluence.get_all_pages_from_space(space=space_key, start=0, limit=50)
-        code_page = next((p for p in pages if p["title"] == request.code_page_title), None)
-        
+
+        # Fetch the code page (and test input page, if any) by title concurrently, in
+        # the background while the Gemini client is set up
+        page_titles = [request.code_page_title]
+        if request.test_input_page_title:
+            page_titles.append(request.test_input_page_title)
+        page_fetch = asyncio.gather(*(
+            asyncio.to_thread(confluence.get_page_by_title, space_key, title, expand="body.storage")
+            for title in page_titles
+        ))
+
+        try:
+            api_key = get_actual_api_key_from_identifier(req.headers.get('x-api-key'))
+            genai.configure(api_key=api_key)
+            ai_model = genai.GenerativeModel("models/gemini-1.5-flash-8b-latest")
+        except BaseException:
+            # Don't leave the page fetches pending with nobody awaiting them
+            page_fetch.cancel()
+            await asyncio.gather(page_fetch, return_exceptions=True)
+            raise
+
+        code_page, *other_pages = await page_fetch
+        test_page = other_pages[0] if other_pages else None
+
         if not code_page:
             raise HTTPException(status_code=400, detail="Code page not found")
-        
-        print(f"Found code page: {code_page['title']}")  # Debug log
-        
-        code_data = confluence.get_page_by_id(code_page["id"], expand="body.storage")
-        code_content = code_data["body"]["storage"]["value"]
-        
-        print(f"Code content length: {len(code_content)}")  # Debug log
-        
+
+        logger.debug("Found code page: %s", code_page['title'])
+
+        code_content = code_page["body"]["storage"]["value"]
+
+        logger.debug("Code content length: %s", len(code_content))
+
         # Get test input page if provided
         test_content = None
         test_filename = None
         if request.test_input_page_title:
-            test_page = next((p for p in pages if p["title"] == request.test_input_page_title), None)
             if test_page:
-                test_data = confluence.get_page_by_id(test_page["id"], expand="body.storage")
-                test_content = test_data["body"]["storage"]["value"]
+                test_content = test_page["body"]["storage"]["value"]
                 test_filename = f"{request.test_input_page_title}.py"
-                print(f"Found test input page: {test_page['title']}")
-                print(f"Test content length: {len(test_content)}")
+                logger.info("Found test input page: %s", test_page['title'])
+                logger.debug("Test content length: %s", len(test_content))
             else:
-                print(f"⚠️ Test input page '{request.test_input_page_title}' not found")
+                logger.warning("⚠️ Test input page '%s' not found", request.test_input_page_title)
         else:
-            print(f"📝 No test input page provided - will create basic test file")
+            logger.info("📝 No test input page provided - will create basic test file")
             # Create a basic test file from the code content
             test_content = f"""import pytest
 from {request.code_page_title.replace(' ', '_').lower()} import *
@@ -1194,21 +1258,21 @@ def test_basic():
     assert True
 """
             test_filename = f"test_{request.code_page_title.replace(' ', '_').lower()}.py"
-            print(f"Created basic test file: {test_filename}")
+            logger.info("Created basic test file: %s", test_filename)
         
         # 🚀 TRIGGER CIRCLECI PIPELINE WITH FILE CONTENT
-        print("🚀 Triggering CircleCI pipeline with file content...")
+        logger.info("🚀 Triggering CircleCI pipeline with file content...")
         
         # Clean code content (remove HTML tags if present)
         clean_code_content = clean_html(code_content)
         clean_test_content = clean_html(test_content) if test_content else None
         
         # Debug: Show content sizes
-        print(f"📄 Clean code content length: {len(clean_code_content)}")
+        logger.debug("📄 Clean code content length: %s", len(clean_code_content))
         if clean_test_content:
-            print(f"🧪 Clean test content length: {len(clean_test_content)}")
+            logger.debug("🧪 Clean test content length: %s", len(clean_test_content))
         else:
-            print(f"🧪 No test content available")
+            logger.info("🧪 No test content available")
         
         # Early size check to prevent CircleCI issues
         def estimate_base64_size(content):
@@ -1221,19 +1285,19 @@ def test_basic():
         code_b64_estimate = estimate_base64_size(clean_code_content)
         test_b64_estimate = estimate_base64_size(clean_test_content)
         
-        print(f"🔍 Estimated base64 sizes - Code: {code_b64_estimate} chars, Test: {test_b64_estimate} chars")
+        logger.debug("🔍 Estimated base64 sizes - Code: %s chars, Test: %s chars", code_b64_estimate, test_b64_estimate)
         
         # If content is too large, truncate it before sending to CircleCI
         if code_b64_estimate > 400:  # More conservative buffer for CircleCI's 512 limit
-            print(f"⚠️ Code content too large for CircleCI, truncating...")
+            logger.warning("⚠️ Code content too large for CircleCI, truncating...")
             # Truncate to ~250 chars to account for base64 expansion
             clean_code_content = clean_code_content[:250] + "\n\n# ... Content truncated for CircleCI compatibility"
-            print(f"📄 Truncated code content length: {len(clean_code_content)}")
+            logger.debug("📄 Truncated code content length: %s", len(clean_code_content))
         
         if test_b64_estimate > 400:
-            print(f"⚠️ Test content too large for CircleCI, truncating...")
+            logger.warning("⚠️ Test content too large for CircleCI, truncating...")
             clean_test_content = clean_test_content[:250] + "\n\n# ... Content truncated for CircleCI compatibility"
-            print(f"🧪 Truncated test content length: {len(clean_test_content)}")
+            logger.debug("🧪 Truncated test content length: %s", len(clean_test_content))
         
         # Clean filenames - remove spaces and ensure proper extension
         clean_code_filename = request.code_page_title.replace(' ', '_')
@@ -1246,8 +1310,8 @@ def test_basic():
             if not clean_test_filename.endswith('.py'):
                 clean_test_filename += '.py'
         
-        print(f"🔍 Debug: Clean code filename: {clean_code_filename}")
-        print(f"🔍 Debug: Clean test filename: {clean_test_filename}")
+        logger.debug("Clean code filename: %s", clean_code_filename)
+        logger.debug("Clean test filename: %s", clean_test_filename)
         
         circleci_result = trigger_circleci_pipeline(
             branch="main",
@@ -1258,7 +1322,7 @@ def test_basic():
         )
         
         if not circleci_result['success']:
-            print(f"⚠️ CircleCI trigger failed: {circleci_result['error']}")
+            logger.warning("⚠️ CircleCI trigger failed: %s", circleci_result['error'])
             # Continue with AI generation even if CircleCI fails
             # Add a note about the CircleCI failure to the response
             circleci_result['note'] = "CircleCI integration failed, but AI analysis continues"
@@ -1419,31 +1483,48 @@ Provide specific examples and code snippets for each category."""
             }
         
         # Log the complete operation
-        print(f"✅ Test strategy generation completed:")
-        print(f"   CircleCI Pipeline ID: {circleci_result.get('pipeline_id', 'N/A')}")
-        print(f"   Strategy Length: {len(strategy_content)} chars")
-        print(f"   Cross-Platform Length: {len(cross_platform_content)} chars")
-        print(f"   Sensitivity Length: {len(sensitivity_content)} chars")
+        logger.info(
+            "✅ Test strategy generation completed: pipeline_id=%s strategy=%d chars, "
+            "cross_platform=%d chars, sensitivity=%d chars",
+            circleci_result.get('pipeline_id', 'N/A'),
+            len(strategy_content), len(cross_platform_content), len(sensitivity_content)
+        )
         
         return result
         
     except Exception as e:
-        print(f"Error in test support: {e}")
-        traceback.print_exc()
+        logger.exception("Error in test support: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
+# /analyze-logs responses cached on disk, keyed by a hash of the submitted test results
+ANALYZE_CACHE_DIR = Path(os.getenv("ANALYZE_CACHE_DIR", ".cache/analyze"))
+ANALYZE_CACHE_TTL = 3600  # seconds
+
 @app.post("/analyze-logs")
 async def analyze_logs(request: Request):
     """Analyze test logs with AI and provide insights"""
     try:
-        api_key = get_actual_api_key_from_identifier(request.headers.get('x-api-key'))
-        genai.configure(api_key=api_key)
-        ai_model = genai.GenerativeModel("models/gemini-1.5-flash-8b-latest")
-        
         # Get test results from request
         body = await request.json()
         test_results = body.get('test_results', {})
         
+        # Identical test results get the cached analysis instead of another AI call
+        cache_key = hashlib.blake2b(
+            json.dumps(test_results, sort_keys=True, default=str).encode("utf-8"),
+            digest_size=16
+        ).hexdigest()
+        cache_file = ANALYZE_CACHE_DIR / f"{cache_key}.json"
+        try:
+            if time.time() - cache_file.stat().st_mtime < ANALYZE_CACHE_TTL:
+                logger.debug("Serving cached log analysis %s", cache_key)
+                return json.loads(cache_file.read_bytes())
+        except (OSError, ValueError):
+            pass
+        
+        api_key = get_actual_api_key_from_identifier(request.headers.get('x-api-key'))
+        genai.configure(api_key=api_key)
+        ai_model = genai.GenerativeModel("models/gemini-1.5-flash-8b-latest")
+        
         # Create AI prompt for log analysis
         prompt = f"""
         Analyze the following test results and provide insights:
@@ -1463,13 +1544,21 @@ async def analyze_logs(request: Request):
         response = ai_model.generate_content(prompt)
         analysis = response.text.strip()
         
-        return {
+        result = {
             "analysis": analysis,
             "test_results": test_results
         }
         
+        try:
+            ANALYZE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            cache_file.write_text(json.dumps(result, default=str), encoding="utf-8")
+        except OSError as e:
+            logger.warning("Could not cache log analysis: %s", e)
+        
+        return result
+        
     except Exception as e:
-        print(f"Log analysis error: {str(e)}")
+        logger.error("Log analysis error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/save-to-confluence")
@@ -1559,7 +1648,7 @@ async def save_to_confluence(request: SaveToConfluenceRequest, req: Request):
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Test support error: {str(e)}")
+        logger.error("Test support error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/preview-save-to-confluence")
@@ -1614,7 +1703,7 @@ async def flowchart_generator(space_key: Optional[str] = Body(None), page_title:
         space_key = auto_detect_space(confluence, space_key)
         
         # Get page content
-        pages = confluence.get_all_pages_from_space(space=space_key, start=0, limit=100)
+        pages = list(iter_space_pages(confluence, space_key))
         selected_page = next((p for p in pages if p["title"] == page_title), None)
         if not selected_page:
             raise HTTPException(status_code=400, detail="Page not found")
@@ -1716,7 +1805,7 @@ Meeting Notes:
                     processed_tasks.append(task_with_link)
                     
             except Exception as e:
-                print(f"Error processing task {task['task']}: {e}")
+                logger.error("Error processing task %s: %s", task['task'], e)
                 # Add task without Jira integration
                 task_with_link = {**task, "jira_key": None, "jira_link": None}
                 processed_tasks.append(task_with_link)
@@ -1771,7 +1860,7 @@ Meeting Notes:
                 confluence_updated = response.status_code == 200
                 
             except Exception as e:
-                print(f"Error updating Confluence: {e}")
+                logger.error("Error updating Confluence: %s", e)
                 confluence_updated = False
         else:
             confluence_updated = False
@@ -1797,11 +1886,11 @@ async def test_endpoint():
 def get_actual_api_key_from_identifier(identifier: str) -> str:
     if identifier and identifier.startswith('GENAI_API_KEY_'):
         key = os.getenv(identifier)
-        print(f"Using API key identifier: {identifier}, value: {key}")  # This will appear in Render logs
+        logger.debug("Using API key identifier: %s", identifier)
         if key:
             return key
     fallback = os.getenv('GENAI_API_KEY_1')
-    print(f"Falling back to GENAI_API_KEY_1, value: {fallback}")
+    logger.debug("Falling back to GENAI_API_KEY_1")
     return fallback
 
 if __name__ == "__main__":
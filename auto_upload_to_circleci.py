@@ -6,9 +6,90 @@ Automated CircleCI Upload - Works with selected code page and test input files
 import os
 import sys
 import json
-import requests
-import base64
-import glob
+import logging
+import logging.handlers
+import mmap
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+# requests/base64/gzip are imported where the upload needs them, so runs that find
+# nothing to upload skip the cost of loading the HTTP stack
+
+logger = logging.getLogger(__name__)
+
+# Per-file classification cache, keyed by path and validated against mtime/size
+SCAN_CACHE_FILE = '.circleci_scan_cache.json'
+SCAN_CACHE_TTL = 7 * 24 * 60 * 60  # re-read entries older than a week
+
+# Content markers used to classify .py files
+TEST_MARKER_RE = re.compile(rb'^[ \t]*(?:(?:async[ \t]+)?def test_|import pytest|from pytest\b)', re.M)
+CODE_MARKER_RE = re.compile(rb'^[ \t]*def \w+', re.M)
+
+# Upper bound on code/test pairs sent in one pipeline trigger
+MAX_PAIRS_PER_PIPELINE = 20
+
+# Our own utility scripts, never uploaded as code or tests
+SKIP_FILES = frozenset({
+    'auto_upload_to_circleci.py',
+    'upload_to_circleci.py',
+    'run_dynamic_tests.py',
+    'download_from_confluence.py',
+    'dynamic_test_runner.py'
+})
+
+# Files smaller than this cannot hold a function definition worth testing
+MIN_SCAN_SIZE = 16
+
+# CircleCI credentials, read once at import; circleci_config.json is the fallback
+CIRCLECI_TOKEN = os.getenv('CIRCLECI_TOKEN')
+CIRCLECI_PROJECT_SLUG = os.getenv('CIRCLECI_PROJECT_SLUG')
+CIRCLECI_CONFIG_FILE = 'circleci_config.json'
+
+def load_scan_cache():
+    """
+    Load the file classification cache, or an empty one if missing/corrupt
+    """
+    try:
+        with open(SCAN_CACHE_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_scan_cache(cache):
+    """
+    Atomically write the file classification cache
+    """
+    tmp_file = SCAN_CACHE_FILE + '.tmp'
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(cache, f)
+    os.replace(tmp_file, SCAN_CACHE_FILE)
+
+def classify_file(file):
+    """
+    Classify a .py file as 'test', 'code' or 'skip' based on its content
+    """
+    with open(file, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return 'skip'
+        # Search the mapped bytes directly: no decode and no per-line Python objects
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if TEST_MARKER_RE.search(mm):
+                return 'test'
+            if CODE_MARKER_RE.search(mm) and not os.path.basename(file).startswith('test_'):
+                # This is likely a code file with functions
+                return 'code'
+    return 'skip'
+
+def classify_file_safe(file):
+    """
+    classify_file for thread-pool use: returns None if the file can't be read
+    """
+    try:
+        return classify_file(file)
+    except OSError:
+        return None
 
 def find_selected_files():
     """
@@ -18,103 +99,248 @@ def find_selected_files():
     code_files = []
     test_files = []
     
-    # Find all .py files
-    py_files = glob.glob("*.py")
+    # Find all .py files; DirEntry caches the stat result from the directory scan
+    with os.scandir('.') as it:
+        py_entries = [
+            e for e in it
+            if e.name.endswith('.py') and e.name not in SKIP_FILES and e.is_file(follow_symlinks=False)
+        ]
     
-    for file in py_files:
-        # Skip our utility scripts
-        if file in ['auto_upload_to_circleci.py', 'upload_to_circleci.py', 'run_dynamic_tests.py', 'download_from_confluence.py', 'dynamic_test_runner.py']:
-            continue
-            
-        # Check if it's a test file (contains test functions)
+    cache = load_scan_cache()
+    new_cache = {}
+    now = time.time()
+    
+    # Reuse the cached classification if the file is unchanged since it was scanned
+    to_scan = []
+    for e in py_entries:
+        file = e.name
         try:
-            with open(file, 'r', encoding='utf-8') as f:
-                content = f.read()
-                if 'def test_' in content or 'import pytest' in content:
-                    test_files.append(file)
-                elif 'def ' in content and not file.startswith('test_'):
-                    # This is likely a code file with functions
-                    code_files.append(file)
-        except:
+            st = e.stat(follow_symlinks=False)
+        except OSError:
             continue
+        if st.st_size < MIN_SCAN_SIZE:
+            continue
+        entry = cache.get(file)
+        if not (entry
+                and entry['mtime_ns'] == st.st_mtime_ns
+                and entry['size'] == st.st_size
+                and now - entry['scanned_at'] < SCAN_CACHE_TTL):
+            entry = {
+                'mtime_ns': st.st_mtime_ns,
+                'size': st.st_size,
+                'scanned_at': now,
+                'kind': None
+            }
+            to_scan.append(file)
+        new_cache[file] = entry
+    
+    # Classify the remaining files in parallel; the work is open/read syscalls, which release the GIL
+    if to_scan:
+        workers = min(16, (os.cpu_count() or 1) * 4, len(to_scan))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for file, kind in zip(to_scan, executor.map(classify_file_safe, to_scan)):
+                if kind is None:
+                    del new_cache[file]
+                else:
+                    new_cache[file]['kind'] = kind
+    
+    for file, entry in new_cache.items():
+        if entry['kind'] == 'test':
+            test_files.append(file)
+        elif entry['kind'] == 'code':
+            code_files.append(file)
+    
+    if new_cache != cache:
+        try:
+            save_scan_cache(new_cache)
+        except OSError:
+            pass
     
     return code_files, test_files
 
+def configure_logging():
+    """
+    Buffer log records in memory; they are written out on errors or when flushed
+    """
+    log_buffer = logging.handlers.MemoryHandler(
+        capacity=256,
+        flushLevel=logging.ERROR,
+        target=logging.StreamHandler(sys.stdout)
+    )
+    logging.basicConfig(level=logging.INFO, format='%(message)s', handlers=[log_buffer])
+    return log_buffer
+
+def flush_logs():
+    """
+    Write out any buffered log records
+    """
+    for handler in logging.getLogger().handlers:
+        handler.flush()
+
+def _str_or_none(value):
+    return value if isinstance(value, str) and value else None
+
+@lru_cache(maxsize=1)
 def get_circleci_config():
     """
-    Get CircleCI configuration from environment or config file
+    Get CircleCI configuration from environment or config file (cached per process)
     """
     # Try environment variables first
-    token = os.getenv('CIRCLECI_TOKEN')
-    project_slug = os.getenv('CIRCLECI_PROJECT_SLUG')
+    token = CIRCLECI_TOKEN
+    project_slug = CIRCLECI_PROJECT_SLUG
     
     # If not in environment, try config file
     if not token or not project_slug:
-        config_file = 'circleci_config.json'
-        if os.path.exists(config_file):
-            try:
-                with open(config_file, 'r') as f:
-                    config = json.load(f)
-                    token = config.get('token')
-                    project_slug = config.get('project_slug')
-            except:
-                pass
+        config_file = CIRCLECI_CONFIG_FILE
+        try:
+            with open(config_file, 'rb') as f:
+                config = json.loads(f.read())
+        except FileNotFoundError:
+            config = {}
+        except (OSError, ValueError) as e:
+            logger.warning("⚠️ Could not read %s: %s", config_file, e)
+            config = {}
+        if not isinstance(config, dict):
+            logger.warning("⚠️ Ignoring %s: expected a JSON object", config_file)
+            config = {}
+        # Only string values are usable; anything else counts as missing
+        token = token or _str_or_none(config.get('token'))
+        project_slug = project_slug or _str_or_none(config.get('project_slug'))
     
     return token, project_slug
 
-def upload_files_to_circleci(code_file_path, test_file_path, circleci_token, project_slug):
+def pair_selected_files(code_files, test_files):
+    """
+    Pair each test file with the code file it imports (or the first code file)
+    """
+    pairs = []
+    for test_file in test_files:
+        try:
+            with open(test_file, 'r', encoding='utf-8') as f:
+                test_content = f.read()
+        except (OSError, UnicodeDecodeError):
+            test_content = ''
+        code_file = next(
+            (c for c in code_files
+             if f"import {c[:-3]}" in test_content or f"from {c[:-3]} import" in test_content),
+            code_files[0]
+        )
+        pairs.append((code_file, test_file))
+    return pairs
+
+def create_circleci_session():
+    """
+    Create an HTTP session that retries transient CircleCI API failures
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+    
+    # Read and status retries are limited to GET: CircleCI may already have accepted a
+    # pipeline-trigger POST that timed out or got a 502, and resending it starts a
+    # duplicate pipeline. Connect failures are still retried for every method
+    retry = Retry(
+        total=5,
+        connect=3,
+        read=3,
+        backoff_factor=0.5,
+        status_forcelist=[429, 502, 503, 504],
+        allowed_methods=frozenset(['GET']),
+        raise_on_status=False
+    )
+    session = requests.Session()
+    session.mount('https://', HTTPAdapter(max_retries=retry))
+    session.headers.update({'Accept-Encoding': 'gzip, deflate'})
+    return session
+
+def encode_file_pairs(file_pairs):
+    """
+    Gzip the code/test file pairs as a JSON list and return it base64-encoded
+    """
+    import base64
+    import gzip
+    import io
+    
+    # Each file is read, serialized and compressed on its own, so only one
+    # uncompressed file is held in memory at a time
+    gz_buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=gz_buffer, mode='wb', compresslevel=6) as gz:
+        gz.write(b'[')
+        for i, (code_file_path, test_file_path) in enumerate(file_pairs):
+            if i:
+                gz.write(b',')
+            with open(code_file_path, 'rb') as f:
+                code_content = f.read().decode('utf-8')
+            with open(test_file_path, 'rb') as f:
+                test_content = f.read().decode('utf-8')
+            gz.write(json.dumps({
+                'code': code_content,
+                'test': test_content,
+                'code_name': os.path.basename(code_file_path),
+                'test_name': os.path.basename(test_file_path)
+            }, separators=(',', ':')).encode('utf-8'))
+        gz.write(b']')
+    
+    return base64.b64encode(gz_buffer.getbuffer()).decode('ascii')
+
+def upload_files_to_circleci(file_pairs, circleci_token, project_slug, session):
     """
-    Upload selected code and test files to CircleCI and trigger pipeline
+    Upload selected code/test file pairs to CircleCI and trigger one pipeline for the batch
     """
+    import requests
+    
+    logger.info("🚀 Uploading %s selected file pair(s) to CircleCI...", len(file_pairs))
+    
+    # All pairs travel in one gzip-compressed parameter; the CircleCI job decodes and writes each file.
+    # A read error aborts the upload straight away
     try:
-        print("🚀 Uploading selected files to CircleCI...")
-        
-        # Read the selected files
-        with open(code_file_path, 'r', encoding='utf-8') as f:
-            code_content = f.read()
-        
-        with open(test_file_path, 'r', encoding='utf-8') as f:
-            test_content = f.read()
-        
-        # Trigger CircleCI pipeline with the selected files
-        trigger_url = f"https://circleci.com/api/v2/project/{project_slug}/pipeline"
-        
-        headers = {
-            'Circle-Token': circleci_token,
-            'Content-Type': 'application/json'
-        }
-        
-        payload = {
-            'parameters': {
-                'code_content': base64.b64encode(code_content.encode()).decode(),
-                'test_content': base64.b64encode(test_content.encode()).decode(),
-                'code_filename': os.path.basename(code_file_path),
-                'test_filename': os.path.basename(test_file_path)
-            }
+        files_b64 = encode_file_pairs(file_pairs)
+    except (OSError, UnicodeDecodeError) as e:
+        logger.error("❌ Error reading files: %s", e)
+        return None
+    
+    # Trigger CircleCI pipeline with the selected files
+    trigger_url = f"https://circleci.com/api/v2/project/{project_slug}/pipeline"
+    
+    headers = {
+        'Circle-Token': circleci_token,
+        'Content-Type': 'application/json'
+    }
+    
+    payload = {
+        'parameters': {
+            'files_b64': files_b64,
+            'files_encoding': 'gzip+b64'
         }
-        
-        response = requests.post(trigger_url, headers=headers, json=payload)
-        
-        if response.status_code == 201:
-            pipeline_data = response.json()
-            pipeline_id = pipeline_data['id']
-            print(f"✅ Pipeline triggered successfully!")
-            print(f"🔗 View pipeline: https://app.circleci.com/pipelines/{project_slug}/{pipeline_id}")
-            return pipeline_id
-        else:
-            print(f"❌ Failed to trigger pipeline: {response.status_code}")
-            print(f"Response: {response.text}")
-            return None
-            
-    except Exception as e:
-        print(f"❌ Error uploading files: {e}")
+    }
+    # Serialize the request body once so retries resend the same bytes
+    body = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    
+    # Transient network/5xx errors are retried by the session's adapter
+    try:
+        response = session.post(trigger_url, headers=headers, data=body, timeout=30)
+    except requests.RequestException as e:
+        logger.error("❌ Error uploading files: %s", e)
+        return None
+    
+    if response.status_code == 201:
+        pipeline_data = response.json()
+        pipeline_id = pipeline_data['id']
+        logger.info("✅ Pipeline triggered successfully!")
+        logger.info("🔗 View pipeline: https://app.circleci.com/pipelines/%s/%s", project_slug, pipeline_id)
+        return pipeline_id
+    else:
+        logger.error("❌ Failed to trigger pipeline: %s", response.status_code)
+        logger.info("Response: %s", response.text)
         return None
 
 def create_config_file():
     """
     Create a config file for CircleCI credentials (one-time setup)
     """
-    print("📝 Setting up CircleCI configuration (one-time setup)...")
+    logger.info("📝 Setting up CircleCI configuration (one-time setup)...")
+    # Write out buffered messages before prompting
+    flush_logs()
     
     token = input("Enter your CircleCI API token: ").strip()
     project_slug = input("Enter your CircleCI project slug (e.g., github/username/repo): ").strip()
@@ -124,65 +350,77 @@ def create_config_file():
         'project_slug': project_slug
     }
     
-    with open('circleci_config.json', 'w') as f:
+    with open(CIRCLECI_CONFIG_FILE, 'w') as f:
         json.dump(config, f, indent=2)
+    # Drop the cached (empty) credentials so later lookups see the new file
+    get_circleci_config.cache_clear()
     
-    print("✅ Configuration saved to circleci_config.json")
+    logger.info("✅ Configuration saved to %s", CIRCLECI_CONFIG_FILE)
     return token, project_slug
 
 def main():
     """
     Main function - automated upload of selected code and test files
     """
-    print("🤖 AUTOMATED CIRCLECI UPLOAD")
-    print("=" * 50)
-    print("📁 Looking for your selected code page and test input files...")
+    logger.info("🤖 AUTOMATED CIRCLECI UPLOAD")
+    logger.info("=" * 50)
+    logger.info("📁 Looking for your selected code page and test input files...")
     
     # Step 1: Find the selected files
     code_files, test_files = find_selected_files()
     
     if not code_files:
-        print("❌ No code files found.")
-        print("💡 Make sure you have selected a code page (.py file with functions)")
+        logger.error("❌ No code files found.")
+        logger.info("💡 Make sure you have selected a code page (.py file with functions)")
         return
     
     if not test_files:
-        print("❌ No test files found.")
-        print("💡 Make sure you have selected a test input file (.py file with test functions)")
+        logger.error("❌ No test files found.")
+        logger.info("💡 Make sure you have selected a test input file (.py file with test functions)")
         return
     
-    print(f"📄 Found code files: {code_files}")
-    print(f"🧪 Found test files: {test_files}")
+    logger.info("📄 Found code files: %s", code_files)
+    logger.info("🧪 Found test files: %s", test_files)
     
-    # Step 2: Select the files (use first ones found)
-    code_file = code_files[0]
-    test_file = test_files[0]
+    # Step 2: Pair every test file with the code file it exercises
+    file_pairs = pair_selected_files(code_files, test_files)
     
-    print(f"\n🎯 Selected files for testing:")
-    print(f"   📄 Code page: {code_file}")
-    print(f"   🧪 Test input: {test_file}")
+    logger.info("\n🎯 Selected files for testing:")
+    for code_file, test_file in file_pairs:
+        logger.info("   📄 Code page: %s  🧪 Test input: %s", code_file, test_file)
     
     # Step 3: Get CircleCI configuration
     token, project_slug = get_circleci_config()
     
     if not token or not project_slug:
-        print("\n⚙️  First time setup - CircleCI configuration needed.")
+        logger.info("\n⚙️  First time setup - CircleCI configuration needed.")
         token, project_slug = create_config_file()
     
-    # Step 4: Upload and trigger pipeline
-    print(f"\n🚀 Starting automated upload and testing...")
-    pipeline_id = upload_files_to_circleci(code_file, test_file, token, project_slug)
-    
-    if pipeline_id:
-        print(f"\n🎉 SUCCESS! Your selected files have been uploaded and testing has started.")
-        print(f"📊 Check the CircleCI dashboard for test results:")
-        print(f"🔗 https://app.circleci.com/pipelines/{project_slug}/{pipeline_id}")
-        print(f"\n📋 Expected test results will show:")
-        print(f"   - Number of test cases")
-        print(f"   - Number of tests passed")
-        print(f"   - Number of tests failed")
+    # Step 4: Upload and trigger pipelines, one per batch of pairs
+    logger.info("\n🚀 Starting automated upload and testing...")
+    pipeline_ids = []
+    with create_circleci_session() as session:
+        for start in range(0, len(file_pairs), MAX_PAIRS_PER_PIPELINE):
+            batch = file_pairs[start:start + MAX_PAIRS_PER_PIPELINE]
+            pipeline_id = upload_files_to_circleci(batch, token, project_slug, session)
+            if pipeline_id:
+                pipeline_ids.append(pipeline_id)
+    
+    if pipeline_ids:
+        logger.info("\n🎉 SUCCESS! Your selected files have been uploaded and testing has started.")
+        logger.info("📊 Check the CircleCI dashboard for test results:")
+        for pipeline_id in pipeline_ids:
+            logger.info("🔗 https://app.circleci.com/pipelines/%s/%s", project_slug, pipeline_id)
+        logger.info("\n📋 Expected test results will show:")
+        logger.info("   - Number of test cases")
+        logger.info("   - Number of tests passed")
+        logger.info("   - Number of tests failed")
     else:
-        print(f"\n❌ Upload failed. Please check your configuration and try again.")
+        logger.error("\n❌ Upload failed. Please check your configuration and try again.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    log_buffer = configure_logging()
+    try:
+        main()
+    finally:
+        log_buffer.flush()
\ No newline at end of file
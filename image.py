@@ -1,25 +1,29 @@
 # ✅ Full Streamlit App: Graph generated strictly from Gemini's extracted CSV (from image)
 
 import os
+import re
+import csv
+import json
+import numpy as np
 import pandas as pd
 import requests
+from requests.adapters import HTTPAdapter
 import streamlit as st
 from io import StringIO, BytesIO
 from PIL import Image, UnidentifiedImageError
-import streamlit as st
 from dotenv import load_dotenv
 import google.generativeai as genai
 from atlassian import Confluence
-from bs4 import BeautifulSoup
-from fpdf import FPDF
-from docx import Document
-from docx.shared import Inches
+from bs4 import BeautifulSoup, SoupStrainer
 import tempfile
-import seaborn as sns
-import matplotlib.pyplot as plt
-from pptx import Presentation
-from pptx.util import Inches
-import streamlit.components.v1 as components
+from concurrent.futures import ThreadPoolExecutor
+import atexit
+import hashlib
+import shutil
+import matplotlib
+
+# Headless backend; pyplot itself is imported by the chart functions when a graph is built
+matplotlib.use("Agg")
 
 load_dotenv()
 
@@ -37,106 +41,249 @@ def init_confluence():
         st.error(f"Confluence initialization failed: {str(e)}")
         return None
 
+# Created on first use and shared across sessions; also configures the API key for uploads
+@st.cache_resource
 def init_ai():
     genai.configure(api_key=os.getenv("GENAI_API_KEY"))
     return genai.GenerativeModel("models/gemini-1.5-flash")
 
+# Keep-alive session shared by all image downloads, sized for the prefetch pool
+@st.cache_resource
+def http_session():
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=16, pool_maxsize=16)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
 def download_image_bytes(url: str, auth):
-    response = requests.get(url, auth=auth)
+    response = http_session().get(url, auth=auth, timeout=10)
     if response.status_code == 200:
         return response.content
     else:
         raise Exception(f"Failed to fetch image (Status: {response.status_code})")
 
-def generate_pdf(image_bytes, summary):
+# Confluence lookups are cached across Streamlit reruns so widget interactions don't refetch
+@st.cache_data(ttl=600, show_spinner=False)
+def fetch_pages(space_key):
+    return init_confluence().get_all_pages_from_space(space=space_key, start=0, limit=100)
+
+@st.cache_data(ttl=600, show_spinner=False)
+def fetch_page_html(page_id):
+    return init_confluence().get_page_by_id(page_id=page_id, expand="body.export_view")["body"]["export_view"]["value"]
+
+# Only <img> tags are built into the tree; the result is reused until the page HTML changes
+@st.cache_data(show_spinner=False)
+def extract_image_urls(html_content, base_url):
+    soup = BeautifulSoup(html_content, "html.parser", parse_only=SoupStrainer("img"))
+    return list({
+        base_url + src if src.startswith("/") else src
+        for img in soup.find_all("img") if (src := img.get("src"))
+    })
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def download_image_bytes_cached(url: str, user, key):
+    return download_image_bytes(url, auth=(user, key))
+
+# Downloads all of a page's images concurrently; a failed download is returned as its exception
+def prefetch_images(urls, user, key):
+    def fetch(url):
+        try:
+            return download_image_bytes_cached(url, user, key)
+        except Exception as e:
+            return e
+
+    with ThreadPoolExecutor(max_workers=min(8, len(urls))) as executor:
+        return list(executor.map(fetch, urls))
+
+# One Gemini upload per distinct image, shared by the summary, Q&A and graph prompts
+@st.cache_resource(ttl=24 * 60 * 60, show_spinner=False)  # Gemini deletes uploads after 48h
+def upload_image_to_gemini(image_bytes: bytes, display_name: str):
+    init_ai()
+    image_path = materialize_image(image_bytes)
+    return genai.upload_file(path=image_path, mime_type=IMAGE_MIME_TYPES[os.path.splitext(image_path)[1]], display_name=display_name)
+
+# Formats fpdf and python-docx embed directly, by file signature
+IMAGE_SIGNATURES = {
+    b"\x89PNG\r\n\x1a\n": ".png",
+    b"\xff\xd8\xff": ".jpg",
+    b"GIF87a": ".gif",
+    b"GIF89a": ".gif",
+}
+IMAGE_MIME_TYPES = {".png": "image/png", ".jpg": "image/jpeg", ".gif": "image/gif"}
+
+# One temp directory per server process, removed when the process exits
+@st.cache_resource
+def image_temp_dir():
+    path = tempfile.mkdtemp(prefix="confluence_images_")
+    atexit.register(shutil.rmtree, path, ignore_errors=True)
+    return path
+
+# Each distinct image is written to disk once, named by its content hash, and the path is
+# shared by every export and Gemini upload. Bytes are written as-is; only formats outside
+# IMAGE_SIGNATURES are re-encoded to PNG
+def materialize_image(image_bytes):
+    suffix = next((ext for sig, ext in IMAGE_SIGNATURES.items() if image_bytes.startswith(sig)), None)
+    digest = hashlib.blake2b(image_bytes, digest_size=16).hexdigest()
+    image_path = os.path.join(image_temp_dir(), digest + (suffix or ".png"))
+    if not os.path.exists(image_path):
+        # A private temp file per writer, so sessions racing on the same image never share
+        # a half-written file; os.replace then swaps a complete copy in atomically
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(image_path))
+        try:
+            with os.fdopen(fd, "wb") as tmp_img:
+                if suffix:
+                    tmp_img.write(image_bytes)
+                else:
+                    Image.open(BytesIO(image_bytes)).save(tmp_img, format="PNG")
+            os.replace(tmp_path, image_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    return image_path
+
+# === Document export ===
+# fpdf/python-docx/python-pptx are imported by the exporter that needs them, not at app start.
+# Each exporter writes the image at image_path (plus the summary, if any) into output
+
+def _export_pdf(output, image_path, summary, image_width):
+    from fpdf import FPDF
+
     pdf = FPDF()
     pdf.add_page()
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as tmp_img:
-        img = Image.open(BytesIO(image_bytes))
-        img.save(tmp_img, format="PNG")
-        tmp_img_path = tmp_img.name
-    pdf.image(tmp_img_path, x=10, w=180)
-    pdf.ln(5)
-    safe_summary = summary.encode('latin-1', 'replace').decode('latin-1')
-    pdf.set_font("Arial", size=12)
-    pdf.multi_cell(0, 10, safe_summary)
-    pdf_output = pdf.output(dest='S').encode('latin-1')
-    return BytesIO(pdf_output)
-
-def generate_docx(image_bytes, summary):
+    pdf.image(image_path, x=10, w=180)
+    if summary:
+        pdf.ln(5)
+        safe_summary = summary.encode('latin-1', 'replace').decode('latin-1')
+        pdf.set_font("Arial", size=12)
+        pdf.multi_cell(0, 10, safe_summary)
+    pdf_output = pdf.output(dest='S')
+    # PyFPDF returns a latin-1 str, fpdf2 returns bytes
+    output.write(pdf_output.encode('latin-1') if isinstance(pdf_output, str) else pdf_output)
+
+def _export_docx(output, image_path, summary, image_width):
+    from docx import Document
+    from docx.shared import Inches
+
     doc = Document()
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as tmp_img:
-        img = Image.open(BytesIO(image_bytes))
-        img.save(tmp_img, format="PNG")
-        tmp_img_path = tmp_img.name
-    doc.add_picture(tmp_img_path, width=Inches(5.5))
-    doc.add_paragraph(summary)
-    output = BytesIO()
+    doc.add_picture(image_path, width=Inches(image_width))
+    if summary:
+        doc.add_paragraph(summary)
     doc.save(output)
-    output.seek(0)
-    return output
 
-def generate_txt(summary):
-    output = BytesIO()
+def _export_pptx(output, image_path, summary, image_width):
+    from pptx import Presentation
+    from pptx.util import Inches
+
+    prs = Presentation()
+    slide = prs.slides.add_slide(prs.slide_layouts[5])  # title-only layout
+    slide.shapes.add_picture(image_path, Inches(1), Inches(1), Inches(image_width), Inches(4.5))
+    prs.save(output)
+
+def _export_txt(output, image_path, summary, image_width):
     output.write(summary.encode())
-    output.seek(0)
-    return output
 
-def generate_md(image_bytes, summary):
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as tmp_img:
-        img = Image.open(BytesIO(image_bytes))
-        img.save(tmp_img, format="PNG")
-        image_path = tmp_img.name
-    content = f"![Image]({image_path})\n\n{summary}"
+def _export_md(output, image_path, summary, image_width):
+    output.write(f"![Image]({image_path})\n\n{summary}".encode())
+
+EXPORTERS = {
+    "pdf": _export_pdf,
+    "docx": _export_docx,
+    "pptx": _export_pptx,
+    "txt": _export_txt,
+    "md": _export_md,
+}
+
+EXPORT_MIME_TYPES = {
+    "pdf": "application/pdf",
+    "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "pptx": "application/vnd.openxmlformats-officedocument.presentationml.presentation",
+    "txt": "text/plain",
+    "md": "text/markdown",
+}
+
+def export_document(fmt, image_bytes=None, summary=None, image_width=5.5):
+    image_path = materialize_image(image_bytes) if image_bytes is not None else None
     output = BytesIO()
-    output.write(content.encode())
+    EXPORTERS[fmt](output, image_path, summary, image_width)
     output.seek(0)
     return output
 
 def plot_grouped_bar(df):
-    melted = df.melt(id_vars=[df.columns[0]], var_name="Group", value_name="Count")
-    plt.figure(figsize=(10, 6))
-    sns.barplot(data=melted, x=melted.columns[0], y="Count", hue="Group")
-    plt.xticks(rotation=45)
-    plt.title("Grouped Bar Chart")
-    plt.tight_layout()
-    return plt.gcf()
+    # Counts are exact, so bars are drawn directly: no melt and no seaborn error-bar bootstrap
+    import matplotlib.pyplot as plt
+
+    label_col, groups = df.columns[0], df.columns[1:]
+    x = np.arange(len(df))
+    width = 0.8 / len(groups)
+    fig, ax = plt.subplots(figsize=(10, 6))
+    for i, group in enumerate(groups):
+        ax.bar(x + i * width, df[group].to_numpy(), width, label=group)
+    ax.set_xticks(x + width * (len(groups) - 1) / 2)
+    ax.set_xticklabels(df[label_col], rotation=45)
+    ax.set_xlabel(label_col)
+    ax.set_ylabel("Count")
+    ax.legend(title="Group")
+    ax.set_title("Grouped Bar Chart")
+    fig.tight_layout()
+    return fig
 
 def plot_stacked_bar(df):
-    df_plot = df.set_index(df.columns[0])
-    plt.figure(figsize=(10, 6))
-    df_plot.drop(columns="Total", errors="ignore").plot(kind='bar', stacked=True)
-    plt.title("Stacked Bar Chart")
-    plt.xticks(rotation=45)
-    plt.ylabel("Count")
-    plt.tight_layout()
-    return plt.gcf()
+    import matplotlib.pyplot as plt
+
+    label_col = df.columns[0]
+    cols = [c for c in df.columns[1:] if c != "Total"]
+    values = np.nan_to_num(df[cols].to_numpy(dtype=np.float64))
+    x = np.arange(len(df))
+    bottom = np.zeros(len(df))
+    fig, ax = plt.subplots(figsize=(10, 6))
+    for i, col in enumerate(cols):
+        ax.bar(x, values[:, i], bottom=bottom, label=col)
+        bottom += values[:, i]
+    ax.set_xticks(x)
+    ax.set_xticklabels(df[label_col], rotation=45)
+    ax.set_xlabel(label_col)
+    ax.legend()
+    ax.set_title("Stacked Bar Chart")
+    ax.set_ylabel("Count")
+    fig.tight_layout()
+    return fig
 
 def plot_line(df):
+    import matplotlib.pyplot as plt
+
     df_plot = df.set_index(df.columns[0])
-    plt.figure(figsize=(10, 6))
-    df_plot.drop(columns="Total", errors="ignore").plot(marker='o')
-    plt.title("Line Chart")
-    plt.xticks(rotation=45)
-    plt.ylabel("Count")
-    plt.tight_layout()
-    return plt.gcf()
+    fig, ax = plt.subplots(figsize=(10, 6))
+    df_plot.drop(columns="Total", errors="ignore").plot(marker='o', ax=ax)
+    ax.set_title("Line Chart")
+    ax.tick_params(axis="x", labelrotation=45)
+    ax.set_ylabel("Count")
+    fig.tight_layout()
+    return fig
 
 def plot_pie(df):
-    plt.figure(figsize=(7, 6))
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(7, 6))
     label_col = df.columns[0]
     
     if "Total" in df.columns:
         data = df["Total"]
     else:
-        # Fallback: Sum across all numeric columns (except label)
-        data = df.iloc[:, 1:].sum(axis=1)
+        # Fallback: Sum across all numeric columns (except label) in one NumPy reduction
+        data = np.nansum(df.iloc[:, 1:].to_numpy(dtype=np.float64), axis=1)
 
-    plt.pie(data, labels=df[label_col], autopct="%1.1f%%", startangle=140)
-    plt.title("Pie Chart (Total Responses)")
-    plt.tight_layout()
-    return plt.gcf()
+    ax.pie(data, labels=df[label_col], autopct="%1.1f%%", startangle=140)
+    ax.set_title("Pie Chart (Total Responses)")
+    fig.tight_layout()
+    return fig
 
+CHART_BUILDERS = {
+    "Grouped Bar": plot_grouped_bar,
+    "Stacked Bar": plot_stacked_bar,
+    "Line": plot_line,
+    "Pie": plot_pie,
+}
 
 def get_image_bytes(fig, fmt):
     buf = BytesIO()
@@ -144,57 +291,61 @@ def get_image_bytes(fig, fmt):
     buf.seek(0)
     return buf
 
+# Preview render: single pass (the plot_* functions already call tight_layout) at screen
+# resolution for raster formats; downloads keep the tight bbox and default dpi
+def get_image_bytes_fast(fig, fmt):
+    buf = BytesIO()
+    fig.savefig(buf, format=fmt, dpi=72 if fmt in ("png", "jpg") else "figure")
+    buf.seek(0)
+    return buf
+
+# Figures aren't thread-safe, so every render builds its own and closes it afterwards;
+# only the resulting bytes are cached and shared between sessions
+def render_chart(df, chart_type, fmt, fast=False):
+    import matplotlib.pyplot as plt
+
+    fig = CHART_BUILDERS[chart_type](df)
+    try:
+        return (get_image_bytes_fast if fast else get_image_bytes)(fig, fmt).getvalue()
+    finally:
+        plt.close(fig)
+
+# Charts are re-rendered only when the extracted table, chart type or format changes,
+# not on every rerun
+@st.cache_data(max_entries=32, show_spinner=False)
+def chart_preview_png(df, chart_type):
+    return render_chart(df, chart_type, "png", fast=True)
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def chart_bytes(df, chart_type, fmt):
+    return render_chart(df, chart_type, fmt)
+
+# A CSV row: any line containing a comma, except code fences and "Here is..." preambles.
+# The lookahead skips the indentation itself, so backtracking out of the leading
+# whitespace can't slip an indented fence or preamble past it
+CSV_LINE_RE = re.compile(r'^(?![^\S\n]*(?:```|here))[^\S\n]*([^\n]*?,[^\n]*?)[^\S\n]*$', re.I | re.M)
+
 def clean_ai_csv(raw_text):
-    lines = raw_text.strip().splitlines()
-    clean_lines = [
-        line.strip() for line in lines
-        if ',' in line and not line.strip().startswith("```") and not line.lower().startswith("here")
-    ]
+    clean_lines = CSV_LINE_RE.findall(raw_text)
     # Remove duplicate headers or malformed lines
-    header = clean_lines[0].split(",")
+    header_col0 = clean_lines[0].split(",", 1)[0]
     cleaned_data = [clean_lines[0]]
-    for line in clean_lines[1:]:
-        if line.split(",")[0] != header[0]:  # skip repeat headers
-            cleaned_data.append(line)
+    cleaned_data += [line for line in clean_lines[1:] if line.split(",", 1)[0] != header_col0]  # skip repeat headers
     return "\n".join(cleaned_data)
 
-def generate_chart_pdf(image_bytes):
-    pdf = FPDF()
-    pdf.add_page()
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as tmp_img:
-        tmp_img.write(image_bytes.read())
-        tmp_img.flush()
-        pdf.image(tmp_img.name, x=10, w=180)
-    output = BytesIO()
-    pdf.output(output)
-    output.seek(0)
-    return output
-
-def generate_chart_docx(image_bytes):
-    doc = Document()
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as tmp_img:
-        tmp_img.write(image_bytes.read())
-        tmp_img.flush()
-        doc.add_picture(tmp_img.name, width=Inches(5.5))
-    output = BytesIO()
-    doc.save(output)
-    output.seek(0)
-    return output
-
-def generate_chart_pptx(image_bytes):
-    prs = Presentation()
-    blank_slide = prs.slides.add_slide(prs.slide_layouts[6])  # blank layout
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as tmp_img:
-        tmp_img.write(image_bytes.read())
-        tmp_img.flush()
-        slide_width = prs.slide_width
-        top = Inches(1)
-        left = Inches(0.5)
-        pic = blank_slide.shapes.add_picture(tmp_img.name, left, top, width=slide_width - Inches(1))
-    output = BytesIO()
-    prs.save(output)
-    output.seek(0)
-    return output
+# The AI tables are a few rows, so csv.reader + DataFrame beats read_csv's setup and type inference;
+# short rows are padded and every column after the label is coerced to numbers in one pass
+def csv_to_dataframe(cleaned_csv):
+    rows = list(csv.reader(StringIO(cleaned_csv), skipinitialspace=True))
+    header, data = rows[0], rows[1:]
+    df = pd.DataFrame([row + [None] * (len(header) - len(row)) for row in data], columns=header)
+    value_cols = df.columns[1:]
+    try:
+        # Fast path: every cell already parses as a float
+        df[value_cols] = df[value_cols].astype(np.float64)
+    except (TypeError, ValueError):
+        df[value_cols] = df[value_cols].apply(pd.to_numeric, errors='coerce')
+    return df
 
 # === Streamlit app ===
 
@@ -204,7 +355,6 @@ st.title("Confluence Page Image Summarizer")
 
 
 confluence = init_confluence()
-ai_model = init_ai()
 
 if confluence:
     st.success("✅ Connected to Confluence")
@@ -213,69 +363,77 @@ if confluence:
 
     if space_key:
         try:
-            pages = confluence.get_all_pages_from_space(space=space_key, start=0, limit=100)
+            pages = fetch_pages(space_key)
             all_titles = [p["title"] for p in pages]
             selected_titles = st.multiselect("Select page titles:", options=all_titles)
 
+            pages_by_title = {p["title"].strip().lower(): p for p in pages}
+
             for page_title in selected_titles:
-                selected_page = next((p for p in pages if p["title"].strip().lower() == page_title.strip().lower()), None)
+                selected_page = pages_by_title.get(page_title.strip().lower())
 
                 if selected_page:
                     page_id = selected_page["id"]
-                    html_content = confluence.get_page_by_id(page_id=page_id, expand="body.export_view")["body"]["export_view"]["value"]
-                    soup = BeautifulSoup(html_content, "html.parser")
-                    base_url = os.getenv("CONFLUENCE_BASE_URL")
-
-                    image_urls = list({
-                        base_url + img["src"] if img["src"].startswith("/") else img["src"]
-                        for img in soup.find_all("img") if img.get("src")
-                    })
+                    html_content = fetch_page_html(page_id)
+                    image_urls = extract_image_urls(html_content, os.getenv("CONFLUENCE_BASE_URL"))
 
                     if not image_urls:
                         st.warning(f"⚠️ No embedded images found in the page '{page_title}'.")
                     else:
                         st.subheader(f"📸 Images in: {page_title}")
+                        prefetched_images = prefetch_images(image_urls, os.getenv('CONFLUENCE_USER_EMAIL'), os.getenv('CONFLUENCE_API_KEY'))
 
                         for idx, url in enumerate(image_urls):
                             summary_key = f"summary_{page_title}_{idx}"
                             ready_key = f"ready_{page_title}_{idx}"
                             image_key = f"image_{page_title}_{idx}"
                             graph_df_key = f"graph_df_{page_title}_{idx}"
-                            graph_fig_key = f"graph_fig_{page_title}_{idx}"
                             chart_type_key = f"chart_type_{page_title}_{idx}"
+                            csv_key = f"csv_{page_title}_{idx}"
 
                             try:
-                                image_bytes = download_image_bytes(url, auth=(os.getenv('CONFLUENCE_USER_EMAIL'), os.getenv('CONFLUENCE_API_KEY')))
+                                image_bytes = prefetched_images[idx]
+                                if isinstance(image_bytes, Exception):
+                                    raise image_bytes
                                 st.session_state[image_key] = image_bytes
 
                                 try:
-                                    image_pil = Image.open(BytesIO(image_bytes))
-                                    st.image(image_pil, use_container_width=True)
+                                    # Image.open only reads the header here; the original bytes go to the browser undecoded
+                                    Image.open(BytesIO(image_bytes))
+                                    st.image(image_bytes, use_container_width=True)
                                 except UnidentifiedImageError:
                                     st.warning(f"Image {idx} could not be loaded.")
                                     continue
 
                                 if st.button("Summarize", key=f"summarize_{page_title}_{idx}"):
                                     with st.spinner("Generating summary..."):
-                                        with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as tmp:
-                                            tmp.write(image_bytes)
-                                            tmp.flush()
-                                            uploaded = genai.upload_file(
-                                                path=tmp.name,
-                                                mime_type="image/png",
-                                                display_name=f"confluence_image_{page_title}_{idx}.png"
-                                            )
+                                        uploaded = upload_image_to_gemini(image_bytes, f"img_{page_title}_{idx}.png")
 
+                                        # One request returns both the summary and, for charts/tables, the CSV
+                                        # that Create Graph needs, so the graph doesn't cost a second call
                                         prompt = (
                                             "You are analyzing a technical image from a documentation page. "
                                             "If it's a chart or graph, explain what is shown in detail. "
                                             "If it's code, summarize what the code does. "
-                                            "Avoid mentioning filenames or metadata. Provide an informative analysis in 2 paragraphs."
+                                            "Avoid mentioning filenames or metadata. Provide an informative analysis in 2 paragraphs.\n"
+                                            "If the image is a chart or table, also extract the full numeric table it represents as raw CSV: "
+                                            "the first column is the response category (e.g., Strongly Agree), followed by columns for group counts "
+                                            "(e.g., Students, Lecturers, Staff, Total), with all values numeric. Otherwise use an empty string.\n"
+                                            'Respond with a JSON object: {"summary": "<analysis>", "csv": "<csv table or empty>"}'
                                         )
 
                                         try:
-                                            response = ai_model.generate_content([uploaded, prompt])
-                                            st.session_state[summary_key] = response.text.strip()
+                                            response = init_ai().generate_content(
+                                                [uploaded, prompt],
+                                                generation_config={"response_mime_type": "application/json"}
+                                            )
+                                            try:
+                                                result = json.loads(response.text)
+                                                summary_text, csv_text = result.get("summary") or "", result.get("csv") or ""
+                                            except (ValueError, AttributeError):
+                                                summary_text, csv_text = response.text, ""
+                                            st.session_state[summary_key] = summary_text.strip()
+                                            st.session_state[csv_key] = csv_text.strip()
                                             st.session_state[ready_key] = True           
 
                                         except Exception as e:
@@ -307,14 +465,7 @@ if confluence:
                                     if user_question and st.session_state.get(ai_response_key) is None:
                                         with st.spinner("Generating AI response..."):
                                             try:
-                                                with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as tmp_img:
-                                                    tmp_img.write(image_bytes)
-                                                    tmp_img.flush()
-                                                    uploaded_img = genai.upload_file(
-                                                        path=tmp_img.name,
-                                                        mime_type="image/png",
-                                                        display_name=f"qa_image_{page_title}_{idx}.png"
-                                                    )
+                                                uploaded_img = upload_image_to_gemini(image_bytes, f"img_{page_title}_{idx}.png")
 
                                                 full_prompt = (
                                                     "You're analyzing a technical image extracted from documentation. "
@@ -324,7 +475,7 @@ if confluence:
                                                     f"User Question:\n{user_question}"
                                                 )
 
-                                                ai_response = ai_model.generate_content([uploaded_img, full_prompt])
+                                                ai_response = init_ai().generate_content([uploaded_img, full_prompt])
                                                 st.session_state[ai_response_key] = ai_response.text.strip()
                                             except Exception as e:
                                                 st.error(f"AI failed to generate a response: {e}")
@@ -339,23 +490,9 @@ if confluence:
                                     file_name = st.text_input("Enter file name (no extension)", value=f"summary_image_{idx}", key=f"file_name_{page_title}_{idx}")
                                     format_choice = st.selectbox("Select format", ["PDF", "DOCX", "TXT", "Markdown"], key=f"format_{page_title}_{idx}")
 
-                                    content, mime, ext = None, "", ""
-                                    if format_choice == "PDF":
-                                        content = generate_pdf(image_bytes, summary)
-                                        mime = "application/pdf"
-                                        ext = "pdf"
-                                    elif format_choice == "DOCX":
-                                        content = generate_docx(image_bytes, summary)
-                                        mime = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-                                        ext = "docx"
-                                    elif format_choice == "TXT":
-                                        content = generate_txt(summary)
-                                        mime = "text/plain"
-                                        ext = "txt"
-                                    elif format_choice == "Markdown":
-                                        content = generate_md(image_bytes, summary)
-                                        mime = "text/markdown"
-                                        ext = "md"
+                                    ext = {"PDF": "pdf", "DOCX": "docx", "TXT": "txt", "Markdown": "md"}[format_choice]
+                                    mime = EXPORT_MIME_TYPES[ext]
+                                    content = export_document(ext, None if ext == "txt" else image_bytes, summary)
 
                                     if content:
                                         st.download_button(
@@ -371,34 +508,26 @@ if confluence:
                                     # ✅ Create Graph button appears only after summary is ready
                                     if st.button("Create Graph", key=f"create_graph_{page_title}_{idx}"):
                                         with st.spinner(" Extracting data from image ..."):
-                                            with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as tmp_img:
-                                                tmp_img.write(image_bytes)
-                                                tmp_img.flush()
-                                                uploaded_img = genai.upload_file(
-                                                    path=tmp_img.name,
-                                                    mime_type="image/png",
-                                                    display_name=f"chart_image_{page_title}_{idx}.png"
+                                            csv_text = st.session_state.get(csv_key)
+                                            if not csv_text:
+                                                uploaded_img = upload_image_to_gemini(image_bytes, f"img_{page_title}_{idx}.png")
+
+                                                graph_prompt = (
+                                                    "You're looking at a Likert-style bar chart image or table. Extract the full numeric table represented by the chart.\n"
+                                                    "Return only the raw CSV table: no markdown, no comments, no code blocks.\n"
+                                                    "The first column must be the response category (e.g., Strongly Agree), followed by columns for group counts (e.g., Students, Lecturers, Staff, Total).\n"
+                                                    "Ensure all values are numeric and the CSV is properly aligned. Do NOT summarize—just output the table."
                                                 )
 
-                                            graph_prompt = (
-                                                "You're looking at a Likert-style bar chart image or table. Extract the full numeric table represented by the chart.\n"
-                                                "Return only the raw CSV table: no markdown, no comments, no code blocks.\n"
-                                                "The first column must be the response category (e.g., Strongly Agree), followed by columns for group counts (e.g., Students, Lecturers, Staff, Total).\n"
-                                                "Ensure all values are numeric and the CSV is properly aligned. Do NOT summarize—just output the table."
-                                            )
-
-                                            graph_response = ai_model.generate_content([uploaded_img, graph_prompt])
-                                            csv_text = graph_response.text.strip()
+                                                graph_response = init_ai().generate_content([uploaded_img, graph_prompt])
+                                                csv_text = graph_response.text.strip()
                                             
 
                                             try:
                                                 cleaned_csv = clean_ai_csv(csv_text)
-                                                df = pd.read_csv(StringIO(cleaned_csv))
-
-                                                for col in df.columns[1:]:
-                                                    df[col] = pd.to_numeric(df[col], errors='coerce')
+                                                df = csv_to_dataframe(cleaned_csv)
 
-                                                df.dropna(subset=df.columns[1:], how='all', inplace=True)
+                                                df = df[df.iloc[:, 1:].notna().any(axis=1)]
 
                                                 if df.empty:
                                                     raise ValueError("Extracted DataFrame is empty after cleaning.")
@@ -416,17 +545,7 @@ if confluence:
                                     df = st.session_state[graph_df_key]
                                     chart_type = st.selectbox("📈 Choose Chart Type", ["Grouped Bar", "Stacked Bar", "Line", "Pie"], key=chart_type_key)
 
-                                    if chart_type == "Grouped Bar":
-                                        fig = plot_grouped_bar(df)
-                                    elif chart_type == "Stacked Bar":
-                                        fig = plot_stacked_bar(df)
-                                    elif chart_type == "Line":
-                                        fig = plot_line(df)
-                                    else:
-                                        fig = plot_pie(df)
-
-                                    st.session_state[graph_fig_key] = fig
-                                    st.pyplot(fig)
+                                    st.image(chart_preview_png(df, chart_type), use_container_width=True)
                                     
                                     
 
@@ -443,48 +562,20 @@ if confluence:
 
                                     if download_format == "PNG":
                                         fmt_ext, mime = "png", "image/png"
-                                        download_data = get_image_bytes(fig, "png")
+                                        download_data = chart_bytes(df, chart_type, "png")
                                     elif download_format == "JPG":
                                         fmt_ext, mime = "jpg", "image/jpeg"
-                                        download_data = get_image_bytes(fig, "jpg")
+                                        download_data = chart_bytes(df, chart_type, "jpg")
                                     elif download_format == "SVG":
                                         fmt_ext, mime = "svg", "image/svg+xml"
-                                        download_data = get_image_bytes(fig, "svg")
+                                        download_data = chart_bytes(df, chart_type, "svg")
                                     elif download_format == "PDF":
                                         fmt_ext, mime = "pdf", "application/pdf"
-                                        download_data = get_image_bytes(fig, "pdf")
-                                    elif download_format == "DOCX":
-                                        from docx import Document
-                                        from docx.shared import Inches
-
-                                        output = BytesIO()
-                                        doc = Document()
-                                        image_stream = get_image_bytes(fig, "png")
-                                        with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as tmp_img:
-                                            tmp_img.write(image_stream.read())
-                                            tmp_img.flush()
-                                            doc.add_picture(tmp_img.name, width=Inches(6))
-                                        doc.save(output)
-                                        output.seek(0)
-                                        fmt_ext, mime, download_data = "docx", "application/vnd.openxmlformats-officedocument.wordprocessingml.document", output
-                                    elif download_format == "PPTX":
-                                        from pptx import Presentation
-                                        from pptx.util import Inches
-
-                                        prs = Presentation()
-                                        slide_layout = prs.slide_layouts[5]  # blank layout
-                                        slide = prs.slides.add_slide(slide_layout)
-
-                                        image_stream = get_image_bytes(fig, "png")
-                                        with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as tmp_img:
-                                            tmp_img.write(image_stream.read())
-                                            tmp_img.flush()
-                                            slide.shapes.add_picture(tmp_img.name, Inches(1), Inches(1), Inches(6), Inches(4.5))
-
-                                        output = BytesIO()
-                                        prs.save(output)
-                                        output.seek(0)
-                                        fmt_ext, mime, download_data = "pptx", "application/vnd.openxmlformats-officedocument.presentationml.presentation", output
+                                        download_data = chart_bytes(df, chart_type, "pdf")
+                                    elif download_format in ("DOCX", "PPTX"):
+                                        fmt_ext = download_format.lower()
+                                        mime = EXPORT_MIME_TYPES[fmt_ext]
+                                        download_data = export_document(fmt_ext, chart_bytes(df, chart_type, "png"), image_width=6)
 
                                     if download_data:
                                         st.download_button(
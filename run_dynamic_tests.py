@@ -1,7 +1,8 @@
 import subprocess
-import re
+import json
 import sys
 import os
+import tempfile
 
 def run_pytest_and_parse():
     # Get the test filename from environment or use default
@@ -9,24 +10,27 @@ def run_pytest_and_parse():
     
     print(f"🔍 Looking for tests in: {test_filename}")
     
-    # Run pytest on the specific test file
-    result = subprocess.run(
-        ['pytest', test_filename, '--tb=short', '-q'],
-        stdout=subprocess.PIPE,
-        stderr=subprocess.STDOUT,
-        text=True
-    )
-    output = result.stdout
+    # Run pytest on the specific test file(s); batched uploads pass a space-separated list.
+    # Output streams straight to the console and the counts come from pytest-json-report,
+    # written to a directory private to this run so a stale report from an earlier run, or
+    # one from an overlapping run, is never read back as this run's result
+    with tempfile.TemporaryDirectory(prefix='pytest_report_') as report_dir:
+        report_file = os.path.join(report_dir, 'pytest_report.json')
+        subprocess.run(
+            ['pytest', *test_filename.split(), '--tb=short', '-q',
+             '--json-report', f'--json-report-file={report_file}'],
+        )
 
-    # Parse test results
-    passed = failed = 0
-    # Look for lines like: "7 passed, 1 failed"
-    summary_match = re.search(r'(\d+) passed', output)
-    if summary_match:
-        passed = int(summary_match.group(1))
-    failed_match = re.search(r'(\d+) failed', output)
-    if failed_match:
-        failed = int(failed_match.group(1))
+        # Parse test results
+        try:
+            with open(report_file, 'r', encoding='utf-8') as f:
+                summary = json.load(f).get('summary', {})
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Could not read pytest report: {e}")
+            summary = {}
+
+    passed = summary.get('passed', 0)
+    failed = summary.get('failed', 0)
     total = passed + failed
 
     print(f"No of test cases: {total}")
@@ -34,4 +38,4 @@ def run_pytest_and_parse():
     print(f"No of test cases failed: {failed}")
 
 if __name__ == "__main__":
-    run_pytest_and_parse()
\ No newline at end of file
+    run_pytest_and_parse()
@@ -1,22 +1,35 @@
 import os
 import io
 import re
-import csv
 import json
+import hashlib
+import pickle
 import time
+import random
+import threading
 import traceback
 import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 from fpdf import FPDF
 from docx import Document
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls
+from xml.sax.saxutils import escape as xml_escape
 from dotenv import load_dotenv
 from atlassian import Confluence
 import google.generativeai as genai
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
 from io import BytesIO
+from html import unescape as html_unescape
 import difflib
 import warnings
 import requests
+from requests.adapters import HTTPAdapter
 import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from collections import defaultdict
+from dataclasses import dataclass
 
 st.set_page_config(
     initial_sidebar_state="collapsed"  # 👈 Collapses sidebar on first load
@@ -50,23 +63,64 @@ selected_key_label = st.sidebar.selectbox(
 
 selected_genai_key = genai_keys[selected_key_label]
 
-# --- Configure Gemini only once or when key is changed ---
-if "configured_key" not in st.session_state or st.session_state["configured_key"] != selected_genai_key:
+# --- Configure Gemini only once or when key is changed (no rerun needed, the rest
+# of this run already picks up the new key) ---
+if st.session_state.get("configured_key", "") != selected_genai_key:
     genai.configure(api_key=selected_genai_key)
-    
-    # 🔁 Clear related AI cache/session variables before rerun
-    keys_to_clear = ["ai_response", "qa_answer", "user_question"]
-    for key in keys_to_clear:
+
+    # 🔁 Clear answers produced with the previous key
+    for key in ("ai_response", "qa_answer", "user_question"):
         st.session_state.pop(key, None)
+    if "test_report" in st.session_state:
+        st.session_state.test_report.chat_answer = ""
 
     st.session_state["configured_key"] = selected_genai_key
-    st.rerun()
 
-    
+
+@st.cache_resource(show_spinner=False)
+def get_model(key_hash):
+    # One model per API key; keyed on a hash so the raw key never lands in the cache
+    model = genai.GenerativeModel("models/gemini-1.5-flash-8b-latest")
+    # One-token warmup so the first real prompt doesn't pay connection setup
+    try:
+        model.generate_content("hi", generation_config={"max_output_tokens": 1})
+    except Exception:
+        pass
+    return model
+
+
+# Responses keyed on the API key and a hash of the prompt, shared across reruns and
+# sessions; exceptions are never cached, so a failed call is simply retried
+@st.cache_data(ttl=3600, show_spinner=False)
+def cached_generate(key_hash, prompt_hash, json_mode, _model, _prompt):
+    generation_config = {"response_mime_type": "application/json"} if json_mode else None
+    return _model.generate_content(_prompt, generation_config=generation_config).text.strip()
+
+
+def generate_text(prompt, json_mode=False):
+    return cached_generate(model_key_hash, hashlib.sha256(prompt.encode()).hexdigest(), json_mode, get_model(model_key_hash), prompt)
+
+
+# A single client, and so a single connection pool, shared by every feature
+@st.cache_resource(show_spinner=False)
+def init_confluence():
+    try:
+        return Confluence(
+            url=os.getenv('CONFLUENCE_BASE_URL'),
+            username=os.getenv('CONFLUENCE_USER_EMAIL'),
+            password=os.getenv('CONFLUENCE_API_KEY'),
+            timeout=30  # long enough for feature_2's attachment listings
+        )
+    except Exception as e:
+        st.error(f"Confluence initialization failed: {str(e)}")
+        return None
+
 
 # ✅ Now safely use genai_key throughout your app
 st.session_state["genai_key"] = selected_genai_key
-model = genai.GenerativeModel("models/gemini-1.5-flash-8b-latest")
+# The model itself is only built (and warmed up) once a feature asks for it, so reruns
+# with no feature selected never touch the Gemini SDK
+model_key_hash = hashlib.blake2b((selected_genai_key or "").encode(), digest_size=8).hexdigest()
 
 st.sidebar.success(f"🧠 Gemini key in use: {selected_genai_key}")
 
@@ -74,45 +128,152 @@ st.sidebar.success(f"🧠 Gemini key in use: {selected_genai_key}")
 
 
 # ------------- Shared Helper Functions -------------
+# Everything outside latin-1 (emojis included) can't be written by FPDF's core fonts
+NON_LATIN1_RE = re.compile(r"[^\x00-\xff]+")
+
+
 def remove_emojis(text):
-    emoji_pattern = re.compile(
-        "["
-        u"\U0001F600-\U0001F64F"
-        u"\U0001F300-\U0001F5FF"
-        u"\U0001F680-\U0001F6FF"
-        u"\U0001F1E0-\U0001F1FF"
-        "]+", flags=re.UNICODE)
-    no_emoji = emoji_pattern.sub(r'', text)
-    return no_emoji.encode('latin-1', 'ignore').decode('latin-1')
-
-
-def extract_audio_ffmpeg(video_path, audio_path):
-    try:
-        ffmpeg.input(video_path).output(audio_path, acodec='mp3', vn=None).run(overwrite_output=True)
-    except ffmpeg.Error as e:
-        raise RuntimeError(f"FFmpeg error: {e.stderr.decode()}")
+    return NON_LATIN1_RE.sub("", text)
+
+
+# Markers used to guess a code block's language; "class" only consumes the keyword so a
+# following "public" is still seen
+LANGUAGE_TOKEN_RE = re.compile(
+    r"(?P<xml><\?xml)|(?P<html>(?i:<html)|<!DOCTYPE html>)|(?P<java_class>\bclass(?=\s+\w))|(?P<public>public)"
+    r"|(?P<cpp>#include)|(?P<python>def )|(?P<javascript>function|=>)"
+)
+
+HTML_TAG_RE = re.compile(r"<[^>]+>")
+
+# Escapes generated text for a storage-format body and turns newlines into <br> in a
+# single pass; "&" is mapped alongside the rest, so nothing is escaped twice
+HTML_TEXT_TABLE = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;", "\n": "<br>"})
+
+SEVERITY_LABELS = {'Low': '🟢 Low', 'Medium': '🟡 Medium', 'High': '🔴 High'}
+SEVERITY_RE = re.compile(r'\b(Low|Medium|High)\b')
+
+# Body of each Confluence code macro, either as CDATA or as escaped text; the tempered
+# dot keeps a macro without a body from matching into the next one
+CODE_MACRO_RE = re.compile(
+    r'<ac:structured-macro\b[^>]*\bac:name="code"[^>]*>'
+    r'(?:(?!</ac:structured-macro>).)*?'
+    r'<ac:plain-text-body>(?:<!\[CDATA\[(.*?)\]\]>|(.*?))</ac:plain-text-body>',
+    re.DOTALL
+)
+
+
+def extract_audio_ffmpeg(video_path):
+    # MP3 is encoded onto ffmpeg's stdout so it can be uploaded while it is produced,
+    # without a temp audio file; stderr is kept to errors only so the pipe never fills up
+    return (
+        ffmpeg.input(video_path)
+        .output("pipe:", format="mp3", acodec="libmp3lame", vn=None)
+        .global_args("-loglevel", "error")
+        .run_async(pipe_stdout=True, pipe_stderr=True)
+    )
+
+
+class RateLimiter:
+    # Thread-safe token bucket allowing `rate` calls per `period` seconds; used as a
+    # context manager around each API call made from the worker pools
+    def __init__(self, rate, period):
+        self.rate = rate
+        self.period = period
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate / self.period)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) * self.period / self.rate
+            time.sleep(wait)
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+# One limiter per service for the whole server process, not per script run
+@st.cache_resource(show_spinner=False)
+def rate_limiter(service, rate, period):
+    return RateLimiter(rate, period)
+
+
+def confluence_limiter():
+    return rate_limiter("confluence", 8, 1.0)
 
 
-def transcribe_with_assemblyai(audio_path):
+def assemblyai_limiter():
+    return rate_limiter("assemblyai", 50, 60.0)
+
+
+def assemblyai_request(session, method, url, max_attempts=5, **kwargs):
+    # Rate limited request that backs off with jitter while AssemblyAI answers 429
+    for attempt in range(max_attempts):
+        with assemblyai_limiter():
+            response = session.request(method, url, **kwargs)
+        if response.status_code != 429:
+            return response
+        time.sleep(random.uniform(0.5, 1.5) * 2 ** attempt)
+    return response
+
+
+@st.cache_resource(show_spinner=False)
+def assemblyai_session():
+    # Pooled keep-alive connections, shared by uploads and the polling loop
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+    return session
+
+
+def transcribe_with_assemblyai(audio_process):
     api_key = os.getenv("ASSEMBLYAI_API_KEY")
     if not api_key:
+        # Reap ffmpeg and release both pipes even though nothing is uploaded
+        try:
+            audio_process.kill()
+        finally:
+            audio_process.wait()
+            audio_process.stdout.close()
+            audio_process.stderr.close()
         raise ValueError("Missing ASSEMBLYAI_API_KEY in environment.")
 
-    # 🔹 Upload audio file
-    with open(audio_path, 'rb') as f:
-        upload_response = requests.post(
-            "https://api.assemblyai.com/v2/upload",
-            headers={"authorization": api_key},
-            data=f
-        )
+    session = assemblyai_session()
+
+    # 🔹 Upload audio straight from the ffmpeg pipe
+    # The piped body can't be replayed, so the upload is rate limited but not retried
+    try:
+        with assemblyai_limiter():
+            upload_response = session.post(
+                "https://api.assemblyai.com/v2/upload",
+                headers={"authorization": api_key},
+                data=audio_process.stdout
+            )
+    finally:
+        audio_process.stdout.close()
+        ffmpeg_errors = audio_process.stderr.read()
+        audio_process.stderr.close()
+        audio_process.wait()
+    if audio_process.returncode != 0:
+        raise RuntimeError(f"FFmpeg error: {ffmpeg_errors.decode(errors='replace')}")
     if upload_response.status_code != 200:
         raise RuntimeError("Upload failed: " + upload_response.text)
 
     audio_url = upload_response.json()["upload_url"]
 
     # 🔹 Start transcription (✅ no extra fields)
-    transcript_response = requests.post(
-        "https://api.assemblyai.com/v2/transcript",
+    transcript_response = assemblyai_request(
+        session, "POST", "https://api.assemblyai.com/v2/transcript",
         headers={
             "authorization": api_key,
             "content-type": "application/json"
@@ -125,11 +286,15 @@ def transcribe_with_assemblyai(audio_path):
 
     transcript_id = transcript_response.json()["id"]
 
-    # 🔁 Polling for result
+    # 🔁 Polling for result: short clips finish in well under a second, so start fast
+    # and back off geometrically up to 3s between polls
+    poll_delay = 0.25
+    poll_deadline = time.monotonic() + 600
     while True:
-        polling_response = requests.get(
-            f"https://api.assemblyai.com/v2/transcript/{transcript_id}",
-            headers={"authorization": api_key}
+        polling_response = assemblyai_request(
+            session, "GET", f"https://api.assemblyai.com/v2/transcript/{transcript_id}",
+            headers={"authorization": api_key},
+            timeout=30
         )
         data = polling_response.json()
 
@@ -139,58 +304,244 @@ def transcribe_with_assemblyai(audio_path):
                 return data["text"]  # fallback to plain if no word timestamps
 
             # ✅ Build [min:sec] formatted lines
-            lines = []
-            current_time = ""
-            current_line = []
+            # Words arrive in time order, so bucketing on the whole second keeps the grouping
+            buckets = defaultdict(list)
             for word in words:
-                start_ms = word.get("start", 0)
-                timestamp = f"[{start_ms // 60000}:{(start_ms % 60000) // 1000:02}]"
-
-                if timestamp != current_time:
-                    if current_line:
-                        lines.append(f"{current_time} {' '.join(current_line)}")
-                    current_time = timestamp
-                    current_line = [word["text"]]
-                else:
-                    current_line.append(word["text"])
-
-            if current_line:
-                lines.append(f"{current_time} {' '.join(current_line)}")
+                buckets[word.get("start", 0) // 1000].append(word["text"])
 
-            return "\n".join(lines)
+            return "\n".join(
+                f"[{second // 60}:{second % 60:02}] {' '.join(texts)}"
+                for second, texts in sorted(buckets.items())
+            )
 
         elif data["status"] == "error":
             raise RuntimeError("Transcription failed: " + data.get("error", "Unknown error"))
-        time.sleep(2)
+        if time.monotonic() > poll_deadline:
+            raise RuntimeError("Transcription timed out")
+        time.sleep(poll_delay)
+        poll_delay = min(poll_delay * 1.5, 3.0)
+
+def download_to_file(session, url, path, chunk_size=1 << 20):
+    # Stream a download straight to disk instead of holding the whole file in memory
+    with confluence_limiter():
+        response = session.get(url, stream=True, timeout=60)
+    with response:
+        response.raise_for_status()
+        with open(path, "wb") as f:
+            for chunk in response.iter_content(chunk_size=chunk_size):
+                f.write(chunk)
+    return path
+
+
+# Finished video results (transcript, summary, quotes) keyed by a hash of the video
+# bytes, so a re-uploaded or renamed attachment skips ffmpeg, AssemblyAI and Gemini
+VIDEO_CACHE_DIR = Path(os.getenv("VIDEO_CACHE_DIR", ".cache/videos"))
+VIDEO_CACHE_TTL = 7 * 24 * 3600  # seconds
+# Impact analyses keyed by a hash of the diff they were generated from
+ANALYSIS_CACHE_DIR = Path(os.getenv("ANALYSIS_CACHE_DIR", ".cache/analysis"))
+ANALYSIS_CACHE_TTL = 3600  # seconds
+
+
+def file_digest(path, chunk_size=1 << 20):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_cached_result(cache_dir, key, ttl=None):
+    cache_file = cache_dir / f"{key}.json"
+    try:
+        if ttl is not None and time.time() - cache_file.stat().st_mtime >= ttl:
+            return None
+        with open(cache_file, "rb") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
 
-def clean_html(html_content):
-    soup = BeautifulSoup(html_content, "html.parser")
-    return soup.get_text(separator="\n")
 
-def create_pdf(text):
+def save_cached_result(cache_dir, key, result, ttl=None):
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        # Expired entries are removed whenever a new one is written, so the directory only
+        # ever holds results from the last ttl seconds
+        if ttl is not None:
+            cutoff = time.time() - ttl
+            for cache_file in cache_dir.glob("*.json"):
+                try:
+                    if cache_file.stat().st_mtime < cutoff:
+                        cache_file.unlink()
+                except OSError:
+                    pass
+        with open(cache_dir / f"{key}.json", "w", encoding="utf-8") as f:
+            json.dump(result, f)
+    except OSError:
+        pass  # caching is best-effort
+
+
+# Confluence reads cached across Streamlit reruns; the leading underscore keeps the
+# client object out of the cache key
+@st.cache_data(ttl=300, show_spinner=False)
+def fetch_spaces(_confluence):
+    return _confluence.get_all_spaces(start=0, limit=100)["results"]
+
+
+def iter_space_pages(confluence, space_key, batch=200):
+    # Pages through the whole space; advancing by what actually came back keeps this
+    # correct when the server caps the batch below the requested size
+    start = 0
+    while True:
+        with confluence_limiter():
+            batch_pages = confluence.get_all_pages_from_space(space=space_key, start=start, limit=batch, expand="version")
+        if not batch_pages:
+            break
+        yield from batch_pages
+        start += len(batch_pages)
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def fetch_space_pages(_confluence, space_key):
+    return list(iter_space_pages(_confluence, space_key))
+
+
+@st.cache_data(ttl=600, show_spinner=False)
+def fetch_page_html(_confluence, page_id, version=None):
+    # version is only part of the cache key, so an edited page is fetched again
+    with confluence_limiter():
+        return _confluence.get_page_by_id(page_id, expand="body.storage")["body"]["storage"]["value"]
+
+
+@st.cache_data(ttl=600, show_spinner=False)
+def fetch_page_text(_confluence, page_id, version=None):
+    raw_html = fetch_page_html(_confluence, page_id, version)
+    return raw_html, BeautifulSoup(raw_html, "html.parser").get_text()
+
+
+def fetch_current_body(confluence, page_id):
+    # Uncached on purpose: a body that is about to be extended and written back must be the
+    # page's latest version, or an edit made since it was cached would be overwritten
+    with confluence_limiter():
+        return confluence.get_page_by_id(page_id, expand="body.storage")["body"]["storage"]["value"]
+
+
+def page_body(confluence, page):
+    # Listings only carry titles and versions; a body is fetched once its page is
+    # actually selected, and refetched when the listed version moves on
+    return fetch_page_html(confluence, page["id"], page.get("version", {}).get("number"))
+
+
+# A page-ready FPDF per font, pickled once; every export unpickles its own fresh copy
+# instead of repeating the document and font setup
+@st.cache_resource(show_spinner=False)
+def pdf_template(font, size):
     pdf = FPDF()
     pdf.add_page()
     pdf.set_auto_page_break(auto=True, margin=15)
-    pdf.set_font("Arial", size=12)
-    for line in text.split('\n'):
-        pdf.multi_cell(0, 10, line)
-    return io.BytesIO(pdf.output(dest='S').encode('latin1'))
+    pdf.set_font(font, size=size)
+    return pickle.dumps(pdf)
+
+
+def new_pdf(font="Arial", size=12):
+    return pickle.loads(pdf_template(font, size))
+
+
+def pdf_bytes(pdf):
+    # st.download_button only takes str, bytes or a few concrete io classes, so the
+    # finished PDF is handed over as plain bytes
+    pdf_output = pdf.output(dest='S')
+    # PyFPDF returns a latin-1 str, fpdf2 returns a bytearray
+    return pdf_output.encode('latin-1') if isinstance(pdf_output, str) else bytes(pdf_output)
+
+def code_macros(code, language, max_chars=50_000):
+    # Large code is split on line boundaries into several code macros so no single
+    # macro body gets huge; "]]>" inside the code is split across two CDATA sections
+    chunks, current, size = [], [], 0
+    for line in code.splitlines(keepends=True):
+        if current and size + len(line) > max_chars:
+            chunks.append("".join(current))
+            current, size = [], 0
+        current.append(line)
+        size += len(line)
+    chunks.append("".join(current))
+    return "<hr/>".join(
+        f'<ac:structured-macro ac:name="code"><ac:parameter ac:name="language">{language}</ac:parameter>'
+        f'<ac:plain-text-body><![CDATA[{chunk.replace("]]>", "]]]]><![CDATA[>")}]]></ac:plain-text-body></ac:structured-macro>'
+        for chunk in chunks
+    )
+
+def save_as_child_page(confluence, space_key, parent_page, label, body):
+    # Reports go to a new child page so only the new block is uploaded, instead of
+    # re-sending the parent's whole, ever-growing body on every save
+    title = f"{parent_page['title']} - {label} {time.strftime('%Y-%m-%d %H:%M:%S')}"
+    with confluence_limiter():
+        confluence.create_page(
+            space=space_key,
+            title=title,
+            body=body,
+            parent_id=parent_page["id"],
+            representation="storage"
+        )
+    return title
+
+def create_pdf(text):
+    pdf = new_pdf()
+    # One multi_cell call wraps the whole text and honours its newlines itself
+    pdf.multi_cell(0, 10, remove_emojis(text))
+    return pdf_bytes(pdf)
+
+# Rendered once per distinct report rather than on every rerun that shows the download button
+@st.cache_data(ttl=3600, max_entries=16, show_spinner=False)
+def cached_pdf_bytes(text):
+    return create_pdf(text)
+
+# Run characters python-docx writes as elements rather than text
+RUN_CONTROL_RE = re.compile(r"([\t\r])")
+RUN_CONTROL_XML = {"\t": "<w:tab/>", "\r": "<w:br/>"}
+
+
+def run_xml(line):
+    # Same run markup as add_paragraph(line): tabs become <w:tab/>, carriage returns <w:br/>
+    return "".join(
+        RUN_CONTROL_XML.get(part) or f'<w:t xml:space="preserve">{xml_escape(part)}</w:t>'
+        for part in RUN_CONTROL_RE.split(line)
+        if part
+    )
+
+
+def append_paragraphs(doc, lines):
+    # Parse every <w:p> from one XML string rather than calling add_paragraph per line
+    paragraphs = parse_xml(
+        f'<w:body {nsdecls("w")}>'
+        + ''.join(f'<w:p><w:r>{run_xml(line)}</w:r></w:p>' if line else '<w:p/>' for line in lines)
+        + '</w:body>'
+    )
+    sect_pr = doc.element.body.sectPr
+    for paragraph in list(paragraphs):
+        if sect_pr is not None:
+            sect_pr.addprevious(paragraph)
+        else:
+            doc.element.body.append(paragraph)
 
 def create_docx(text):
     doc = Document()
-    for line in text.split('\n'):
-        doc.add_paragraph(line)
+    append_paragraphs(doc, text.split('\n'))
     buffer = io.BytesIO()
     doc.save(buffer)
     buffer.seek(0)
     return buffer
 
+def csv_field(line):
+    # Same output as csv.writer's QUOTE_MINIMAL for a single-column row
+    if not line:
+        return '""'
+    if ',' in line or '"' in line or '\r' in line:
+        return '"' + line.replace('"', '""') + '"'
+    return line
+
 def create_csv(text):
-    output = io.StringIO()
-    writer = csv.writer(output)
-    for line in text.strip().split('\n'):
-        writer.writerow([line])
-    return io.BytesIO(output.getvalue().encode())
+    data = "".join(f"{csv_field(line)}\r\n" for line in text.strip().split('\n'))
+    return io.BytesIO(data.encode())
 
 def create_json(text):
     return io.BytesIO(json.dumps({"response": text}, indent=4).encode())
@@ -214,30 +565,11 @@ def feature_1():
     raw_page = query_params.get("page")
     auto_page = raw_page[0] if isinstance(raw_page, list) else raw_page
 
-    @st.cache_resource
-    def init_confluence():
-        try:
-            return Confluence(
-                url=os.getenv('CONFLUENCE_BASE_URL'),
-                username=os.getenv('CONFLUENCE_USER_EMAIL'),
-                password=os.getenv('CONFLUENCE_API_KEY'),
-                timeout=10
-            )
-        except Exception as e:
-            st.error(f"Confluence initialization failed: {str(e)}")
-            return None
-
-    def init_ai():
-        genai.configure(api_key=st.session_state["genai_key"])
-        return genai.GenerativeModel("models/gemini-1.5-flash-8b-latest")
-
-    def clean_html(raw_html):
-        soup = BeautifulSoup(raw_html, "html.parser")
-        return soup.get_text()
-
     confluence = init_confluence()
-    ai_model = init_ai()
+    ai_model = get_model(model_key_hash)
     selected_pages = []
+    selected_pages_by_id = {}
+    pages_by_title = {}
     full_context = ""
 
     if confluence:
@@ -250,7 +582,7 @@ def feature_1():
         else:
             try:
                 # Fetch spaces
-                spaces = confluence.get_all_spaces(start=0, limit=100)["results"]
+                spaces = fetch_spaces(confluence)
                 space_options = {f"{s['name']} ({s['key']})": s['key'] for s in spaces}
                 space_names = list(space_options.keys())
 
@@ -274,22 +606,27 @@ def feature_1():
         if space_key:
             try:
                 # Fetch pages for selected space
-                pages = confluence.get_all_pages_from_space(space=space_key, start=0, limit=100)
-                all_titles = [p["title"] for p in pages]
+                pages = fetch_space_pages(confluence, space_key)
+                pages_by_title = {p["title"]: p for p in pages}
+                all_titles = list(pages_by_title)
 
                 select_all = st.checkbox("Select All Pages")
                 selected_titles = st.multiselect("Select Page(s):", all_titles, default=all_titles if select_all else [])
                 show_content = st.checkbox("Show Page Content")
 
-                selected_pages = [p for p in pages if p["title"] in selected_titles]
+                selected_pages = [pages_by_title[title] for title in selected_titles]
 
                 if selected_pages:
                     st.success(f"✅ Loaded {len(selected_pages)} page(s).")
-                    for page in selected_pages:
-                        page_id = page["id"]
-                        page_data = confluence.get_page_by_id(page_id, expand="body.storage")
-                        raw_html = page_data["body"]["storage"]["value"]
-                        text_content = clean_html(raw_html)
+                    # Fetch the page bodies concurrently; results come back in selection order
+                    with ThreadPoolExecutor(max_workers=min(8, len(selected_pages))) as executor:
+                        page_texts = list(executor.map(
+                            lambda p: fetch_page_text(confluence, p["id"], p.get("version", {}).get("number")),
+                            selected_pages
+                        ))
+                    for page, (raw_html, text_content) in zip(selected_pages, page_texts):
+                        # Kept so saving back to a page doesn't have to fetch its body again
+                        selected_pages_by_id[page["id"]] = {"title": page["title"]}
                         full_context += f"\n\nTitle: {page['title']}\n{text_content}"
                         if show_content:
                             with st.expander(f"📄 {page['title']}"):
@@ -358,15 +695,14 @@ def feature_1():
         if st.button("✏️ Save AI Response to Confluence"):
             if target_page_title:
                 try:
-                    matching_pages = [p for p in selected_pages if p["title"] == target_page_title]
-                    if not matching_pages:
+                    target_page = pages_by_title.get(target_page_title)
+                    if not target_page or target_page["id"] not in selected_pages_by_id:
                         st.error("Page not found in selected pages.")
                     else:
-                        page_id = matching_pages[0]["id"]
-                        existing_page = confluence.get_page_by_id(page_id, expand="body.storage")
-                        existing_content = existing_page["body"]["storage"]["value"]
+                        page_id = target_page["id"]
+                        existing_content = fetch_current_body(confluence, page_id)
 
-                        updated_body = f"{existing_content}<hr/><h3>AI Response</h3><p>{st.session_state.ai_response.replace('\n', '<br>')}</p>"
+                        updated_body = f"{existing_content}<hr/><h3>AI Response</h3><p>{st.session_state.ai_response.translate(HTML_TEXT_TABLE)}</p>"
 
                         confluence.update_page(
                             page_id=page_id,
@@ -374,6 +710,8 @@ def feature_1():
                             body=updated_body,
                             representation="storage"
                         )
+                        # The page has a new version now; drop the cached listing so its body is refetched
+                        fetch_space_pages.clear()
                         st.success("✅ AI response saved to Confluence page.")
                 except Exception as e:
                     st.error(f"❌ Failed to update page: {str(e)}")
@@ -390,21 +728,7 @@ def feature_2():
     raw_page = query_params.get("page")
     auto_page = raw_page[0] if isinstance(raw_page, list) else raw_page
 
-    @st.cache_resource
-    def init_confluence():
-        try:
-            return Confluence(
-                url=os.getenv("CONFLUENCE_BASE_URL"),
-                username=os.getenv("CONFLUENCE_USER_EMAIL"),
-                password=os.getenv("CONFLUENCE_API_KEY"),
-                timeout=30
-            )
-        except Exception as e:
-            st.error(f"Confluence init failed: {e}")
-            return None
-
-    genai.configure(api_key=st.session_state["genai_key"])
-    ai_model = genai.GenerativeModel("models/gemini-1.5-flash-8b-latest")
+    ai_model = get_model(model_key_hash)
     confluence = init_confluence()
 
     if ffmpeg is None:
@@ -422,8 +746,9 @@ def feature_2():
             
         if space_key:
             try:
-                pages = confluence.get_all_pages_from_space(space=space_key, start=0, limit=100)
-                page_titles = [p["title"] for p in pages]
+                pages = fetch_space_pages(confluence, space_key)
+                pages_by_title = {p["title"]: p for p in pages}
+                page_titles = list(pages_by_title)
                 selected_pages = st.multiselect("Select Pages to Process:", page_titles)
                 if selected_pages:
                     summaries = []
@@ -434,6 +759,27 @@ def feature_2():
                         page_id = page["id"]
                         st.markdown(f"### 🎬 Processing: {title}")
                         attachments = confluence.get(f"/rest/api/content/{page_id}/child/attachment?limit=50")
+
+                        # Download every not-yet-processed video on the page concurrently
+                        base_url = os.getenv('CONFLUENCE_BASE_URL').rstrip('/')
+                        pending_downloads = {}
+                        for attachment in attachments["results"]:
+                            video_name = attachment["title"].strip()
+                            if video_name.lower().endswith(".mp4") and f"{page_id}_{video_name}".replace(" ", "_") not in st.session_state:
+                                pending_downloads[video_name] = (
+                                    f"{base_url}{attachment['_links']['download']}",
+                                    f"{title}_{video_name}".replace(" ", "_")
+                                )
+                        downloads = {}
+                        if pending_downloads:
+                            with st.spinner("📥 Downloading videos..."):
+                                with ThreadPoolExecutor(max_workers=min(4, len(pending_downloads))) as executor:
+                                    futures = {
+                                        name: executor.submit(download_to_file, confluence._session, url, path)
+                                        for name, (url, path) in pending_downloads.items()
+                                    }
+                                    downloads = {name: future.exception() or future.result() for name, future in futures.items()}
+
                         for attachment in attachments["results"]:
                             video_name = attachment["title"].strip()
                             if not video_name.lower().endswith(".mp4"):
@@ -441,35 +787,43 @@ def feature_2():
                             session_key = f"{page_id}_{video_name}".replace(" ", "_")
                             with st.container():
                                 if session_key not in st.session_state:
-                                    with st.spinner("📥 Downloading and processing..."):
+                                    with st.spinner("⚙️ Processing..."):
                                         try:
-                                            video_url = attachment["_links"]["download"]
-                                            full_url = f"{os.getenv('CONFLUENCE_BASE_URL').rstrip('/')}{video_url}"
-                                            local_path = f"{title}_{video_name}".replace(" ", "_")
-                                            video_data = confluence._session.get(full_url).content
-                                            with open(local_path, "wb") as f:
-                                                f.write(video_data)
+                                            local_path = downloads[video_name]
+                                            if isinstance(local_path, Exception):
+                                                raise local_path
     
-                                            extract_audio_ffmpeg(local_path, "temp_audio.mp3")
-                                            transcript = transcribe_with_assemblyai("temp_audio.mp3")
+                                            video_hash = file_digest(local_path)
+                                            cached_result = load_cached_result(VIDEO_CACHE_DIR, video_hash, VIDEO_CACHE_TTL)
+                                            if cached_result:
+                                                st.session_state[session_key] = cached_result
+                                            else:
+                                                transcript = transcribe_with_assemblyai(extract_audio_ffmpeg(local_path))
     
-                                            # Generate summary
-                                            quote_prompt = f"Set a title \"Quotes:\" in bold. Extract powerful or interesting quotes:\n{transcript}"
-                                            quotes = ai_model.generate_content(quote_prompt).text
-                                            summary_prompt = (
-                                                f"Start with title as \"Summary:\" in bold, followed by a paragraph.\n"
-                                                "**Timestamps:**\n"
-                                                "Extract and list only 5–7 important moments from the following transcript.\n"
-                                                "Each moment should be one full sentence with the [min:sec] timestamp.\n\n"
-                                                f"Transcript:\n{transcript}"
-                                            )
-                                            summary = ai_model.generate_content(summary_prompt).text
+                                                # Generate summary
+                                                # Quotes and summary come back from one request, split on section markers
+                                                video_prompt = (
+                                                    "Return exactly two sections, each starting with its marker line.\n"
+                                                    "===QUOTES===\n"
+                                                    "Set a title \"Quotes:\" in bold. Extract powerful or interesting quotes.\n"
+                                                    "===SUMMARY===\n"
+                                                    "Start with title as \"Summary:\" in bold, followed by a paragraph.\n"
+                                                    "**Timestamps:**\n"
+                                                    "Extract and list only 5–7 important moments from the following transcript.\n"
+                                                    "Each moment should be one full sentence with the [min:sec] timestamp.\n\n"
+                                                    f"Transcript:\n{transcript}"
+                                                )
+                                                video_response = ai_model.generate_content(video_prompt).text
+                                                quotes, _, summary = video_response.partition("===SUMMARY===")
+                                                quotes = quotes.replace("===QUOTES===", "").strip()
+                                                summary = summary.strip()
     
-                                            st.session_state[session_key] = {
-                                                "transcript": transcript,
-                                                "summary": summary,
-                                                "quotes": quotes
-                                            }
+                                                st.session_state[session_key] = {
+                                                    "transcript": transcript,
+                                                    "summary": summary,
+                                                    "quotes": quotes
+                                                }
+                                                save_cached_result(VIDEO_CACHE_DIR, video_hash, st.session_state[session_key], VIDEO_CACHE_TTL)
                                         except Exception as e:
                                             st.error(f"❌ Error: {e}")
                                             continue
@@ -519,12 +873,7 @@ def feature_2():
                             export_content = f"{content['quotes']}\n\n{content['summary']}"
 
                             if format_choice == "PDF":
-                                pdf = FPDF()
-                                pdf.add_page()
-                                pdf.set_font("Arial", size=12)
-                                for line in remove_emojis(export_content).split("\n"):
-                                    pdf.multi_cell(0, 10, line)
-                                file_data = pdf.output(dest="S").encode("latin-1")
+                                file_data = create_pdf(export_content)
                                 mime = "application/pdf"
                             else:
                                 file_data = export_content.encode("utf-8")
@@ -540,21 +889,16 @@ def feature_2():
 
                     if len(summaries) > 1:
                         st.markdown("## 📦 Export All Summaries")
-                        all_text = ""
-                        all_text = ""
-                        for t, s, q, _ in summaries:
-                            all_text += f"\n\n---\n\n{t}\n\nQuotes:\n{q}\n\nSummary:\n{s}\n"
+                        all_text = "".join(
+                            f"\n\n---\n\n{t}\n\nQuotes:\n{q}\n\nSummary:\n{s}\n"
+                            for t, s, q, _ in summaries
+                        )
 
 
                         file_name = st.text_input("Filename (without extension):", value="All_Summaries")
                         export_format = st.selectbox("Format:", ["PDF", "TXT"])
                         if export_format == "PDF":
-                            pdf = FPDF()
-                            pdf.add_page()
-                            pdf.set_font("Arial", size=12)
-                            for line in remove_emojis(all_text).split("\n"):
-                                pdf.multi_cell(0, 10, line)
-                            file_data = pdf.output(dest="S").encode("latin-1")
+                            file_data = create_pdf(all_text)
                             mime = "application/pdf"
                             ext = "pdf"
                         else:
@@ -583,21 +927,21 @@ def feature_2():
                         if st.button("✏️ Save Video Summaries to Confluence"):
                             if target_page_title:
                                 try:
-                                    matching_pages = [p for p in pages if p["title"] == target_page_title]
-                                    if not matching_pages:
+                                    target_page = pages_by_title.get(target_page_title)
+                                    if not target_page:
                                         st.error("Page not found in selected pages.")
                                     else:
-                                        page_id = matching_pages[0]["id"]
-                                        existing_page = confluence.get_page_by_id(page_id, expand="body.storage")
-                                        existing_content = existing_page["body"]["storage"]["value"]
+                                        page_id = target_page["id"]
+                                        existing_content = fetch_current_body(confluence, page_id)
                                         
                                         # Create summary content
-                                        summary_content = "<hr/><h3>Video Summaries</h3>"
-                                        for summary_title, summary, quotes, _ in summaries:
-                                            summary_content += f"<h4>{summary_title}</h4>"
-                                            summary_content += f"<h5>Quotes:</h5><p>{quotes.replace(chr(10), '<br>')}</p>"
-                                            summary_content += f"<h5>Summary:</h5><p>{summary.replace(chr(10), '<br>')}</p>"
-                                            summary_content += "<hr/>"
+                                        summary_content = "<hr/><h3>Video Summaries</h3>" + "".join(
+                                            f"<h4>{summary_title}</h4>"
+                                            f"<h5>Quotes:</h5><p>{quotes.translate(HTML_TEXT_TABLE)}</p>"
+                                            f"<h5>Summary:</h5><p>{summary.translate(HTML_TEXT_TABLE)}</p>"
+                                            "<hr/>"
+                                            for summary_title, summary, quotes, _ in summaries
+                                        )
                                         
                                         updated_body = existing_content + summary_content
                                         
@@ -607,6 +951,7 @@ def feature_2():
                                             body=updated_body,
                                             representation="storage"
                                         )
+                                        fetch_space_pages.clear()
                                         st.success("✅ Video summaries saved to Confluence page.")
                                 except Exception as e:
                                     st.error(f"❌ Failed to update page: {str(e)}")
@@ -629,89 +974,63 @@ def feature_3():
     raw_page = query_params.get("page")
     auto_page = raw_page[0] if isinstance(raw_page, list) else raw_page
     
-    @st.cache_resource
-    def init_confluence():
-        try:
-            return Confluence(
-                url=os.getenv('CONFLUENCE_BASE_URL'),
-                username=os.getenv('CONFLUENCE_USER_EMAIL'),
-                password=os.getenv('CONFLUENCE_API_KEY'),
-                timeout=10
-            )
-        except Exception as e:
-            st.error(f"Confluence initialization failed: {str(e)}")
-            return None
-    def init_ai():
-        genai.configure(api_key=st.session_state["genai_key"])
-        return genai.GenerativeModel("models/gemini-1.5-flash-8b-latest")
     def strip_code_fences(text: str) -> str:
         return re.sub(r"^```[a-zA-Z]*\n|```$", "", text.strip(), flags=re.MULTILINE)
     def extract_visible_code(html_content: str) -> str:
-        soup = BeautifulSoup(html_content, "html.parser")
-        for tag in soup.find_all(['pre', 'code']):
+        # Build only the <pre>/<code> subtrees; the full tree is parsed just for the fallback
+        code_soup = BeautifulSoup(html_content, "html.parser", parse_only=SoupStrainer(["pre", "code"]))
+        for tag in code_soup.find_all(['pre', 'code']):
             code_text = tag.get_text()
             if code_text.strip():
                 return code_text
-        return soup.get_text(separator="\n").strip()
+        return BeautifulSoup(html_content, "html.parser").get_text(separator="\n").strip()
     def detect_language_from_content(content: str) -> str:
-        if "<?xml" in content:
-            return "xml"
-        if "<html" in content.lower() or "<!DOCTYPE html>" in content:
+        # Single pass over the content, then the original precedence between languages
+        found = set()
+        for match in LANGUAGE_TOKEN_RE.finditer(content):
+            if match.lastgroup == "xml":
+                return "xml"
+            found.add(match.lastgroup)
+        if "html" in found:
             return "html"
-        if content.strip().startswith("{") or content.strip().startswith("["):
+        if content.lstrip()[:1] in ("{", "["):
             return "json"
-        if re.search(r"\bclass\s+\w+", content) and "public" in content:
+        if "java_class" in found and "public" in found:
             return "java"
-        if "#include" in content:
-            return "cpp"
-        if "def " in content:
-            return "python"
-        if "function" in content or "=>" in content:
-            return "javascript"
+        for language in ("cpp", "python", "javascript"):
+            if language in found:
+                return language
         return "text"
-    def flatten_dict(d, parent_key='', sep='.'):  # for CSV
-        items = []
-        for k, v in d.items():
-            new_key = f"{parent_key}{sep}{k}" if parent_key else k
-            if isinstance(v, dict):
-                items.extend(flatten_dict(v, new_key, sep=sep).items())
-            else:
-                items.append((new_key, v))
-        return dict(items)
     def create_csv(content):
         try:
+            import pandas as pd  # only needed for this export
+
             json_data = json.loads(content)
             if isinstance(json_data, dict):
-                json_data = [flatten_dict(json_data)]
+                json_data = [json_data]
             if isinstance(json_data, list) and all(isinstance(item, dict) for item in json_data):
-                flattened = [flatten_dict(item) for item in json_data]
-                fieldnames = sorted(set().union(*(d.keys() for d in flattened)))
-                output = io.StringIO()
-                writer = csv.DictWriter(output, fieldnames=fieldnames)
-                writer.writeheader()
-                writer.writerows(flattened)
-                return output.getvalue()
+                # json_normalize flattens nested keys as "a.b"; convert_dtypes keeps integer
+                # columns with gaps as integers instead of floats
+                df = pd.json_normalize(json_data, sep='.').convert_dtypes()
+                # Written straight into a bytes buffer the download button can read as-is
+                output = io.BytesIO()
+                df.reindex(columns=sorted(df.columns)).to_csv(output, index=False, encoding="utf-8")
+                output.seek(0)
+                return output
             return "Invalid structure for CSV"
         except Exception as e:
             return f"Invalid CSV conversion: {e}"
     def create_txt(content):
         return content
     def create_pdf(content):
-        pdf = FPDF()
-        pdf.add_page()
-        pdf.set_auto_page_break(auto=True, margin=15)
-        pdf.set_font("Courier", size=10)
-        for line in content.splitlines():
-            pdf.multi_cell(0, 5, line)
-        pdf_output = BytesIO()
-        pdf_bytes = pdf.output(dest='S').encode('latin-1')
-        pdf_output.write(pdf_bytes)
-        pdf_output.seek(0)
-        return pdf_output
+        pdf = new_pdf("Courier", 10)
+        # Sanitised once up front; characters the core fonts can't encode become "?" so
+        # the code keeps its shape instead of multi_cell raising on the first one
+        pdf.multi_cell(0, 5, content.encode('latin-1', 'replace').decode('latin-1'))
+        return pdf_bytes(pdf)
     def create_docx(content):
         doc = Document()
-        for line in content.splitlines():
-            doc.add_paragraph(line)
+        append_paragraphs(doc, content.splitlines())
         doc_output = BytesIO()
         doc.save(doc_output)
         doc_output.seek(0)
@@ -721,7 +1040,7 @@ def feature_3():
     def create_json(content):
         return content
     confluence = init_confluence()
-    ai_model = init_ai()
+    ai_model = get_model(model_key_hash)
     context = ""
     selected_page = None
     detected_lang = "text"
@@ -737,8 +1056,9 @@ def feature_3():
             
         if space_key:
             try:
-                pages = confluence.get_all_pages_from_space(space=space_key, start=0, limit=100)
-                page_titles = [p["title"] for p in pages]
+                pages = fetch_space_pages(confluence, space_key)
+                pages_by_title = {p["title"]: p for p in pages}
+                page_titles = list(pages_by_title)
                 
                 # Auto-select page if available from query params
                 if auto_page:
@@ -753,11 +1073,10 @@ def feature_3():
                     )
                     
                 if selected_title:
-                    selected_page = next((p for p in pages if p["title"] == selected_title), None)
+                    selected_page = pages_by_title.get(selected_title)
                 if selected_page:
                     page_id = selected_page["id"]
-                    page_content = confluence.get_page_by_id(page_id, expand="body.storage")
-                    context = page_content["body"]["storage"]["value"]
+                    context = page_body(confluence, selected_page)
                     detected_lang = detect_language_from_content(context)
                     st.success(f"✅ Loaded page: {selected_title}")
                     cleaned_code = extract_visible_code(context)
@@ -846,28 +1165,18 @@ def feature_3():
                         if st.button("✏️ Save Converted Code to Confluence"):
                             if target_page_title:
                                 try:
-                                    matching_pages = [p for p in pages if p["title"] == target_page_title]
-                                    if not matching_pages:
+                                    target_page = pages_by_title.get(target_page_title)
+                                    if not target_page:
                                         st.error("Page not found in selected pages.")
                                     else:
-                                        page_id = matching_pages[0]["id"]
-                                        existing_page = confluence.get_page_by_id(page_id, expand="body.storage")
-                                        existing_content = existing_page["body"]["storage"]["value"]
-                                        
                                         # Create code content with proper formatting
-                                        code_content = f"<hr/><h3>Converted Code ({selected_lang})</h3>"
-                                        code_content += f"<ac:structured-macro ac:name=\"code\"><ac:parameter ac:name=\"language\">{selected_lang.lower()}</ac:parameter>"
-                                        code_content += f"<ac:plain-text-body><![CDATA[{st.session_state.converted_code}]]></ac:plain-text-body></ac:structured-macro>"
-                                        
-                                        updated_body = existing_content + code_content
-                                        
-                                        confluence.update_page(
-                                            page_id=page_id,
-                                            title=target_page_title,
-                                            body=updated_body,
-                                            representation="storage"
+                                        code_content = f"<hr/><h3>Converted Code ({selected_lang})</h3>" + code_macros(
+                                            st.session_state.converted_code, selected_lang.lower()
                                         )
-                                        st.success("✅ Converted code saved to Confluence page.")
+                                        
+                                        child_title = save_as_child_page(confluence, space_key, target_page, "Converted Code", code_content)
+                                        fetch_space_pages.clear()
+                                        st.success(f"✅ Converted code saved to child page: {child_title}")
                                 except Exception as e:
                                     st.error(f"❌ Failed to update page: {str(e)}")
                             else:
@@ -880,11 +1189,6 @@ def feature_3():
 # ------------- Feature 4: Impact Analyzer -------------
 def feature_4():
     import re
-    import regex
-    def remove_emojis(text):
-    # Remove symbols, emojis, and non-latin characters safely
-        return regex.sub(r'[\p{So}\p{Sk}\p{Cn}]+', '', text)
-
     st.title("🧠 Confluence AI Impact Analyzer")
     
     # Get query parameters for auto-selection
@@ -894,43 +1198,32 @@ def feature_4():
     raw_page = query_params.get("page")
     auto_page = raw_page[0] if isinstance(raw_page, list) else raw_page
     
-    @st.cache_resource
-    def init_confluence():
-        try:
-            return Confluence(
-                url=os.getenv('CONFLUENCE_BASE_URL'),
-                username=os.getenv('CONFLUENCE_USER_EMAIL'),
-                password=os.getenv('CONFLUENCE_API_KEY'),
-                timeout=10
-            )
-        except Exception as e:
-            st.error(f"Confluence init failed: {str(e)}")
-            return None
-    genai.configure(api_key=st.session_state["genai_key"])
-    model = genai.GenerativeModel("models/gemini-1.5-flash-8b-latest")
     MAX_CHARS = 10000
     def extract_code_blocks(content):
-        soup = BeautifulSoup(content, 'html.parser')
-        blocks = soup.find_all('ac:structured-macro', {'ac:name': 'code'})
         return '\n'.join(
-            block.find('ac:plain-text-body').text
-            for block in blocks if block.find('ac:plain-text-body')
+            # A body holding "]]>" is stored as adjacent CDATA sections; join them back up
+            cdata.replace("]]><![CDATA[", "") or html_unescape(plain)
+            for cdata, plain in CODE_MACRO_RE.findall(content)
         )
     def clean_and_truncate_prompt(text, max_chars=MAX_CHARS):
-        text = re.sub(r'<[^>]+>', '', text)
-        text = re.sub(r'[^\x00-\x7F]+', '', text)
-        return text[:max_chars]
-    def safe_generate(prompt, retries=3):
+        # Dropping non-ASCII through the codec is a single C-level pass
+        return HTML_TAG_RE.sub('', text).encode('ascii', 'ignore').decode('ascii')[:max_chars]
+    def generate_with_retries(prompt, retries=3):
+        # None once every attempt has failed
         prompt = clean_and_truncate_prompt(prompt)
-        fallback_prompt = "Explain this code change or answer a general question about code quality."
         for i in range(retries):
             try:
-                return model.generate_content(prompt).text.strip()
+                return generate_text(prompt)
             except Exception as e:
                 st.warning(f"Retry {i+1} failed: {e}")
                 time.sleep(2)
+        return None
+    def fallback_generate():
         st.warning("⚠️ Using fallback response due to repeated errors.")
-        return model.generate_content(fallback_prompt).text.strip()
+        return generate_text("Explain this code change or answer a general question about code quality.")
+    def safe_generate(prompt, retries=3):
+        text = generate_with_retries(prompt, retries)
+        return fallback_generate() if text is None else text
     confluence = init_confluence()
     if confluence:
         st.success("✅ Connected to Confluence")
@@ -945,8 +1238,9 @@ def feature_4():
         page_titles = []
         if space_key:
             try:
-                pages = confluence.get_all_pages_from_space(space=space_key, start=0, limit=100)
-                page_titles = [p["title"] for p in pages]
+                pages = fetch_space_pages(confluence, space_key)
+                pages_by_title = {p["title"]: p for p in pages}
+                page_titles = list(pages_by_title)
             except Exception as e:
                 st.error(f"Error fetching pages from space '{space_key}': {e}")
         if page_titles:
@@ -957,11 +1251,11 @@ def feature_4():
             new_page_title = ""
         if old_page_title and new_page_title:
             try:
-                old_page = next((p for p in pages if p["title"] == old_page_title), None)
-                new_page = next((p for p in pages if p["title"] == new_page_title), None)
+                old_page = pages_by_title.get(old_page_title)
+                new_page = pages_by_title.get(new_page_title)
                 if old_page and new_page:
-                    old_raw = confluence.get_page_by_id(old_page["id"], expand="body.storage")["body"]["storage"]["value"]
-                    new_raw = confluence.get_page_by_id(new_page["id"], expand="body.storage")["body"]["storage"]["value"]
+                    old_raw = page_body(confluence, old_page)
+                    new_raw = page_body(confluence, new_page)
                     old_code = extract_code_blocks(old_raw)
                     new_code = extract_code_blocks(new_raw)
                     st.subheader(f"📄 {old_page_title} Code")
@@ -974,8 +1268,11 @@ def feature_4():
                         diff = difflib.unified_diff(old_lines, new_lines, fromfile=old_page_title, tofile=new_page_title, lineterm='')
                         full_diff_text = '\n'.join(diff)
                         safe_diff = clean_and_truncate_prompt(full_diff_text)
-                        lines_added = sum(1 for l in full_diff_text.splitlines() if l.startswith('+') and not l.startswith('+++'))
-                        lines_removed = sum(1 for l in full_diff_text.splitlines() if l.startswith('-') and not l.startswith('---'))
+                        # Every line start follows a newline, so substring counts (done in C) give the
+                        # +/- lines; the +++/--- file headers are subtracted back out
+                        counted_diff = '\n' + full_diff_text
+                        lines_added = counted_diff.count('\n+') - counted_diff.count('\n+++')
+                        lines_removed = counted_diff.count('\n-') - counted_diff.count('\n---')
                         total_lines = len(old_lines) or 1
                         percent_change = round(((lines_added + lines_removed) / total_lines) * 100, 2)
                         code_blocks_changed = abs(old_code.count('\n') // 5 - new_code.count('\n') // 5)
@@ -990,9 +1287,20 @@ def feature_4():
                             </ul>
                         </div>
                         """, unsafe_allow_html=True)
-                        if "impact_text" not in st.session_state:
-                            st.session_state.impact_text = safe_generate(
-                                        f"""Write 2 paragraphs summarizing the overall impact of the following code diff.
+                        # Analyses belong to one diff: a different page pair starts from the disk
+                        # cache for that diff, or from scratch
+                        diff_hash = hashlib.sha256(safe_diff.encode()).hexdigest()
+                        if st.session_state.get("diff_hash") != diff_hash:
+                            for key in ("impact_text", "rec_text", "risk_text", "qa_answer", "user_question"):
+                                st.session_state.pop(key, None)
+                            st.session_state.update(load_cached_result(ANALYSIS_CACHE_DIR, diff_hash, ANALYSIS_CACHE_TTL) or {})
+                            # Analyses that fell back to the generic answer are shown but never cached
+                            st.session_state.fallback_analyses = set()
+                            st.session_state.diff_hash = diff_hash
+                        fallback_analyses = st.session_state.setdefault("fallback_analyses", set())
+                        # The three analyses are independent; the missing ones are generated concurrently
+                        analysis_prompts = {
+                            "impact_text": f"""Write 2 paragraphs summarizing the overall impact of the following code diff.
                             
                                         Cover only:
                                         - What was changed
@@ -1002,11 +1310,8 @@ def feature_4():
                                         Keep it within 20 sentences.
                                         
                                         Code Diff:
-                                        {safe_diff}"""
-                                            )
-                        if "rec_text" not in st.session_state:
-                                st.session_state.rec_text = safe_generate(
-                                        f"""As a senior engineer, write 2 paragraphs suggesting improvements for the following code diff.
+                                        {safe_diff}""",
+                            "rec_text": f"""As a senior engineer, write 2 paragraphs suggesting improvements for the following code diff.
 
                                         Focus on:
                                         - Code quality
@@ -1016,19 +1321,31 @@ def feature_4():
                                         Limit to 20 sentences.
                                         
                                         Code Diff:
-                                        {safe_diff}"""
-                                            )
-                        if "risk_text" not in st.session_state:
-                            raw_risk = safe_generate(f"Assess the risk of each change in this code diff with severity tags (Low, Medium, High):\n\n{safe_diff}")
-                            st.session_state.risk_text = re.sub(
-                                r'\b(Low|Medium|High)\b',
-                                lambda m: {
-                                    'Low': '🟢 Low',
-                                    'Medium': '🟡 Medium',
-                                    'High': '🔴 High'
-                                }[m.group(0)],
-                                raw_risk
-                            )
+                                        {safe_diff}""",
+                            "risk_text": f"Assess the risk of each change in this code diff with severity tags (Low, Medium, High):\n\n{safe_diff}",
+                        }
+                        pending_analyses = {key: prompt for key, prompt in analysis_prompts.items() if key not in st.session_state}
+                        if pending_analyses:
+                            # Worker threads get this run's context so the retry warnings still render
+                            script_ctx = get_script_run_ctx()
+                            with ThreadPoolExecutor(
+                                max_workers=len(pending_analyses),
+                                initializer=lambda: add_script_run_ctx(threading.current_thread(), script_ctx)
+                            ) as executor:
+                                results = dict(zip(pending_analyses, executor.map(generate_with_retries, pending_analyses.values())))
+                            for key, text in results.items():
+                                if text is None:
+                                    results[key] = fallback_generate()
+                                    fallback_analyses.add(key)
+                            if "risk_text" in results:
+                                results["risk_text"] = SEVERITY_RE.sub(lambda m: SEVERITY_LABELS[m.group(0)], results["risk_text"])
+                            for key, text in results.items():
+                                st.session_state[key] = text
+                            generated = {
+                                key: st.session_state[key] for key in analysis_prompts if key not in fallback_analyses
+                            }
+                            if generated:
+                                save_cached_result(ANALYSIS_CACHE_DIR, diff_hash, generated, ANALYSIS_CACHE_TTL)
                         st.subheader("📌 Impact Analysis Summary")
                         st.markdown(st.session_state.impact_text)
                         st.subheader("✨ AI-Powered Change Recommendations")
@@ -1085,23 +1402,15 @@ Answer:"""
                                 mime="text/markdown"
                             )
                         elif export_format.startswith("PDF"):
-                            pdf = FPDF()
-                            pdf.add_page()
-                            pdf.set_font("Arial", size=12)
+                            pdf = new_pdf()
 
-                            clean_report = remove_emojis(md_content)  # <-- clean content before PDF
-                            for line in clean_report.split("\n"):
-                                try:
-                                    pdf.multi_cell(0, 10, line)
-                                except Exception:
-                                    # Fallback for any unexpected characters
-                                    safe_line = line.encode("latin-1", "replace").decode("latin-1")
-                                    pdf.multi_cell(0, 10, safe_line)
+                            # Only latin-1 survives the core fonts, so dropping everything else up
+                            # front also covers emojis and leaves nothing for multi_cell to reject
+                            pdf.multi_cell(0, 10, remove_emojis(md_content))
 
-                            pdf_bytes = pdf.output(dest='S').encode("latin-1")
                             st.download_button(
                                 label="📥 Download PDF",
-                                data=BytesIO(pdf_bytes),
+                                data=pdf_bytes(pdf),
                                 file_name=f"{file_name}.pdf",
                                 mime="application/pdf"
                             )
@@ -1127,14 +1436,10 @@ Answer:"""
                         if st.button("✏️ Save Impact Analysis to Confluence"):
                             if target_page_title:
                                 try:
-                                    matching_pages = [p for p in pages if p["title"] == target_page_title]
-                                    if not matching_pages:
+                                    target_page = pages_by_title.get(target_page_title)
+                                    if not target_page:
                                         st.error("Page not found in selected pages.")
                                     else:
-                                        page_id = matching_pages[0]["id"]
-                                        existing_page = confluence.get_page_by_id(page_id, expand="body.storage")
-                                        existing_content = existing_page["body"]["storage"]["value"]
-                                        
                                         # Create impact analysis content
                                         impact_content = "<hr/><h3>Impact Analysis Report</h3>"
                                         impact_content += f"<h4>Change Metrics</h4>"
@@ -1142,19 +1447,13 @@ Answer:"""
                                         impact_content += f"<li>Lines Removed: {lines_removed}</li>"
                                         impact_content += f"<li>Percentage Changed: {percent_change}%</li>"
                                         impact_content += f"<li>Code Blocks Changed: {code_blocks_changed}</li></ul>"
-                                        impact_content += f"<h4>Impact Summary</h4><p>{st.session_state.impact_text.replace(chr(10), '<br>')}</p>"
-                                        impact_content += f"<h4>Recommendations</h4><p>{st.session_state.rec_text.replace(chr(10), '<br>')}</p>"
-                                        impact_content += f"<h4>Risk Analysis</h4><p>{st.session_state.risk_text.replace(chr(10), '<br>')}</p>"
-                                        
-                                        updated_body = existing_content + impact_content
+                                        impact_content += f"<h4>Impact Summary</h4><p>{st.session_state.impact_text.translate(HTML_TEXT_TABLE)}</p>"
+                                        impact_content += f"<h4>Recommendations</h4><p>{st.session_state.rec_text.translate(HTML_TEXT_TABLE)}</p>"
+                                        impact_content += f"<h4>Risk Analysis</h4><p>{st.session_state.risk_text.translate(HTML_TEXT_TABLE)}</p>"
                                         
-                                        confluence.update_page(
-                                            page_id=page_id,
-                                            title=target_page_title,
-                                            body=updated_body,
-                                            representation="storage"
-                                        )
-                                        st.success("✅ Impact analysis saved to Confluence page.")
+                                        child_title = save_as_child_page(confluence, space_key, target_page, "Impact Analysis", impact_content)
+                                        fetch_space_pages.clear()
+                                        st.success(f"✅ Impact analysis saved to child page: {child_title}")
                                 except Exception as e:
                                     st.error(f"❌ Failed to update page: {str(e)}")
                             else:
@@ -1165,6 +1464,38 @@ Answer:"""
         st.error("❌ Connection to Confluence failed.")
 
 # ------------- Feature 5: Test Support Tool -------------
+STRATEGY_INSTRUCTION = "The above is a code snippet. Based on this, please generate appropriate test strategies and test cases. Mention types of testing (unit, integration, regression), areas that require special attention, and possible edge cases."
+CROSS_PLATFORM_INSTRUCTION = "You are a cross-platform UI testing expert. Analyze the above frontend code and generate test strategies. Include: - Desktop, Mobile Web, Tablet test cases - UI/viewport issues in one paragraph - Framework/tool suggestions in one paragraph"
+
+
+# Everything the test support tool keeps between reruns, in one session-state slot
+# instead of loose keys that other features could collide with
+@dataclass
+class TestReportState:
+    strategy: str = ""
+    cross_platform: str = ""
+    sensitivity: str = ""
+    chat_answer: str = ""
+
+
+def generate_test_analyses(code_content):
+    # Both analyses come back from one JSON-mode call, so the long code block is only
+    # processed once; the prompts open with the same code block for prefix caching
+    code_prefix = f"CODE:\n{code_content}\n---\n"
+    prompt = (
+        code_prefix
+        + "Answer both tasks below and return a JSON object with two markdown string fields, "
+        + "\"strategy\" for task 1 and \"cross_platform\" for task 2.\n"
+        + f"Task 1: {STRATEGY_INSTRUCTION}\nTask 2: {CROSS_PLATFORM_INSTRUCTION}"
+    )
+    try:
+        analyses = json.loads(generate_text(prompt, json_mode=True))
+        return analyses["strategy"].strip(), analyses["cross_platform"].strip()
+    except (ValueError, KeyError, TypeError, AttributeError):
+        # Malformed or incomplete JSON: ask for each analysis on its own
+        return generate_text(code_prefix + STRATEGY_INSTRUCTION), generate_text(code_prefix + CROSS_PLATFORM_INSTRUCTION)
+
+
 def feature_5():
     st.title("🤖 Confluence AI Test Support Tool")
     
@@ -1175,32 +1506,8 @@ def feature_5():
     raw_page = query_params.get("page")
     auto_page = raw_page[0] if isinstance(raw_page, list) else raw_page
     
-    @st.cache_resource
-    def init_ai():
-        genai.configure(api_key=st.session_state["genai_key"])
-        return genai.GenerativeModel("models/gemini-1.5-flash-8b-latest")
-    @st.cache_resource
-    def init_confluence():
-        try:
-            return Confluence(
-                url=os.getenv('CONFLUENCE_BASE_URL'),
-                username=os.getenv('CONFLUENCE_USER_EMAIL'),
-                password=os.getenv('CONFLUENCE_API_KEY'),
-                timeout=10
-            )
-        except Exception as e:
-            st.error(f"Confluence initialization failed: {str(e)}")
-            return None
-    ai_model = init_ai()
     confluence = init_confluence()
-    if 'strategy_text' not in st.session_state:
-        st.session_state.strategy_text = ""
-    if 'cross_text' not in st.session_state:
-        st.session_state.cross_text = ""
-    if 'sensitivity_text' not in st.session_state:
-        st.session_state.sensitivity_text = ""
-    if 'ai_response' not in st.session_state:
-        st.session_state.ai_response = ""
+    report = st.session_state.setdefault("test_report", TestReportState())
     if confluence:
         st.success("✅ Connected to Confluence!")
         
@@ -1213,78 +1520,71 @@ def feature_5():
             
         if space_key:
             try:
-                pages = confluence.get_all_pages_from_space(space=space_key, start=0, limit=50)
-                titles = [page['title'] for page in pages]
+                pages = fetch_space_pages(confluence, space_key)
+                pages_by_title = {page['title']: page for page in pages}
+                titles = list(pages_by_title)
                 
                 # Auto-select pages if available from query params
             
                 selected_code_title = st.selectbox("Select Code Page", options=titles, index=None, placeholder="Choose a code page")
                 selected_test_input_title = st.selectbox("Select Test Input Page", options=titles, index=None, placeholder="Choose a test input page")
                     
-                code_page = next((p for p in pages if p["title"] == selected_code_title), None)
-                test_input_page = next((p for p in pages if p["title"] == selected_test_input_title), None)
+                code_page = pages_by_title.get(selected_code_title)
+                test_input_page = pages_by_title.get(selected_test_input_title)
+                test_input_content = page_body(confluence, test_input_page) if test_input_page else ""
+                # A button click is already visible in session state at the top of the rerun,
+                # so the sensitivity request can join the other analyses in one batch
+                classify_requested = bool(test_input_page) and st.session_state.get("classify_sensitive", False)
+                # Report fields mapped to the call that fills them
+                pending_jobs = {}
+                if code_page and not (report.strategy and report.cross_platform):
+                    code_content = page_body(confluence, code_page)
+                    pending_jobs[("strategy", "cross_platform")] = lambda: generate_test_analyses(code_content)
+                if classify_requested:
+                    prompt_sensitivity = f"DATA:\n{test_input_content}\n---\nYou are a data privacy expert. Classify sensitive fields (PII, credentials, financial) in the above data and provide masking suggestions."
+                    pending_jobs[("sensitivity",)] = lambda: (generate_text(prompt_sensitivity),)
+                # The jobs are independent, so the missing ones are requested concurrently
+                if pending_jobs:
+                    with st.spinner("🧪 Generating test analyses..."):
+                        script_ctx = get_script_run_ctx()
+                        with ThreadPoolExecutor(
+                            max_workers=len(pending_jobs),
+                            initializer=lambda: add_script_run_ctx(threading.current_thread(), script_ctx)
+                        ) as executor:
+                            responses = executor.map(lambda job: job(), pending_jobs.values())
+                            for names, results in zip(pending_jobs, responses):
+                                for name, result in zip(names, results):
+                                    setattr(report, name, result)
                 if code_page:
-                    code_data = confluence.get_page_by_id(code_page["id"], expand="body.storage")
-                    code_content = code_data["body"]["storage"]["value"]
                     st.markdown("### 📘 Confluence Test Strategy Generator")
-                    if not st.session_state.strategy_text:
-                        with st.spinner("🧪 Generating test strategy..."):
-                            prompt_strategy = f"""The following is a code snippet:\n\n{code_content}\n\nBased on this, please generate appropriate test strategies and test cases. Mention types of testing (unit, integration, regression), areas that require special attention, and possible edge cases."""
-                            response_strategy = ai_model.generate_content(prompt_strategy)
-                            st.session_state.strategy_text = response_strategy.text.strip()
                     st.subheader("📋 Suggested Test Strategies and Test Cases")
-                    st.markdown(st.session_state.strategy_text)
+                    st.markdown(report.strategy)
                     st.markdown("### 🌐 Cross-Platform Testing Intelligence")
-                    if not st.session_state.cross_text:
-                        with st.spinner("🧠 Analyzing for cross-platform compatibility..."):
-                            prompt_cross_platform = f"""You are a cross-platform UI testing expert. Analyze the following frontend code and generate test strategies. Code:\n{code_content}\n\nInclude: - Desktop, Mobile Web, Tablet test cases - UI/viewport issues in one paragraph - Framework/tool suggestions in one paragraph"""
-                            response_cross_platform = ai_model.generate_content(prompt_cross_platform)
-                            st.session_state.cross_text = response_cross_platform.text.strip()
                     st.subheader("📋 Suggested Strategy and Test Cases")
-                    st.markdown(st.session_state.cross_text)
+                    st.markdown(report.cross_platform)
                 if test_input_page:
-                    test_data = confluence.get_page_by_id(test_input_page["id"], expand="body.storage")
-                    test_input_content = test_data["body"]["storage"]["value"]
                     st.markdown("### 🔒 Data Sensitivity Classifier for Test Inputs")
                     st.code(test_input_content, language="json")
-                    if st.button("🔍 Classify Sensitive Data"):
-                        with st.spinner("🔐 Analyzing for sensitive data..."):
-                            prompt_sensitivity = f"""You are a data privacy expert. Classify sensitive fields (PII, credentials, financial) and provide masking suggestions.\n\nData:\n{test_input_content}"""
-                            response_sensitivity = ai_model.generate_content(prompt_sensitivity)
-                            st.session_state.sensitivity_text = response_sensitivity.text.strip()
-                    if st.session_state.sensitivity_text:
+                    # Handled in the batch above on the rerun this click triggers
+                    st.button("🔍 Classify Sensitive Data", key="classify_sensitive")
+                    if report.sensitivity:
                         st.subheader("📋 Sensitivity Analysis and Recommendations")
-                        st.markdown(st.session_state.sensitivity_text)
-                if all([
-                    st.session_state.strategy_text,
-                    st.session_state.cross_text,
-                    st.session_state.sensitivity_text
-                ]):
+                        st.markdown(report.sensitivity)
+                if report.strategy and report.cross_platform and report.sensitivity:
                     st.markdown("### 📥 Download Full Report")
                     filename_input = st.text_input("Enter filename (without extension):", value="ai_testing_report", key="filename_input")
                     file_format = st.selectbox("Select file format:", ["TXT", "PDF"], key="format_selector")
-                    full_report = (
-                        "📘 Test Strategy:\n" + st.session_state.strategy_text + "\n\n"
-                        "🌐 Cross-Platform Testing:\n" + st.session_state.cross_text + "\n\n"
-                        "🔒 Sensitivity Analysis:\n" + st.session_state.sensitivity_text
-                    )
+                    full_report = "\n\n".join([
+                        "📘 Test Strategy:\n" + report.strategy,
+                        "🌐 Cross-Platform Testing:\n" + report.cross_platform,
+                        "🔒 Sensitivity Analysis:\n" + report.sensitivity
+                    ])
                     filename = f"{filename_input}.{file_format.lower()}"
                     if file_format == "TXT":
                         file_bytes = full_report.encode("utf-8")
                         mime = "text/plain"
                     else:
-                        pdf = FPDF()
-                        pdf.add_page()
-                        pdf.set_auto_page_break(auto=True, margin=15)
-                        pdf.set_font("Arial", size=12)
-                        clean_report = remove_emojis(full_report)
-                        for line in clean_report.split("\n"):
-                            try:
-                                pdf.multi_cell(0, 10, line)
-                            except:
-                                pdf.multi_cell(0, 10, line.encode('latin-1', 'replace').decode('latin-1'))
-                        pdf_output = pdf.output(dest='S').encode("latin-1")
-                        file_bytes = BytesIO(pdf_output).getvalue()
+                        file_bytes = cached_pdf_bytes(full_report)
                         mime = "application/pdf"
                     st.download_button(
                         label="📄 Generate and Download File",
@@ -1297,14 +1597,15 @@ def feature_5():
                     
                     if user_question:
                         with st.spinner("🤖 Thinking..."):
-                            prompt_chat = f"""Based on the following content:\n📘 Test Strategy:\n{st.session_state.strategy_text}\n🌐 Cross-Platform Testing:\n{st.session_state.cross_text}\n🔒 Sensitivity Analysis:\n{st.session_state.sensitivity_text}\n\nAnswer this user query: \"{user_question}\" """
-                            ai_response = ai_model.generate_content(prompt_chat)
-                            st.session_state.ai_response = ai_response.text.strip()
+                            prompt_chat = f"""📘 Test Strategy:\n{report.strategy}\n🌐 Cross-Platform Testing:\n{report.cross_platform}\n🔒 Sensitivity Analysis:\n{report.sensitivity}\n---\nBased on the above content, answer this user query: \"{user_question}\" """
+                            # The prompt embeds all three analyses, so a repeated question on
+                            # unchanged results is answered from the cache
+                            report.chat_answer = generate_text(prompt_chat)
                     else:
-                        st.session_state.ai_response = ""  # ❗ Clear previous response if no new question is asked
+                        report.chat_answer = ""  # ❗ Clear previous response if no new question is asked
                     
-                    if st.session_state.get("ai_response"):
-                        st.markdown(f"**🤖 AI Response:** {st.session_state.ai_response}")
+                    if report.chat_answer:
+                        st.markdown(f"**🤖 AI Response:** {report.chat_answer}")
                     
                     # Save to Confluence functionality
                     st.markdown("---")
@@ -1320,25 +1621,31 @@ def feature_5():
                     if st.button("✏️ Save Test Analysis to Confluence"):
                         if target_page_title:
                             try:
-                                matching_pages = [p for p in pages if p["title"] == target_page_title]
-                                if not matching_pages:
+                                target_page = pages_by_title.get(target_page_title)
+                                if not target_page:
                                     st.error("Page not found in selected pages.")
                                 else:
-                                    page_id = matching_pages[0]["id"]
-                                    existing_page = confluence.get_page_by_id(page_id, expand="body.storage")
-                                    existing_content = existing_page["body"]["storage"]["value"]
+                                    page_id = target_page["id"]
+                                    existing_content = fetch_current_body(confluence, page_id)
                                     
                                     # Create test analysis content
-                                    test_content = "<hr/><h3>Test Analysis Report</h3>"
-                                    test_content += f"<h4>Test Strategy</h4><p>{st.session_state.strategy_text.replace(chr(10), '<br>')}</p>"
-                                    test_content += f"<h4>Cross-Platform Testing</h4><p>{st.session_state.cross_text.replace(chr(10), '<br>')}</p>"
-                                    test_content += f"<h4>Sensitivity Analysis</h4><p>{st.session_state.sensitivity_text.replace(chr(10), '<br>')}</p>"
+                                    strategy_html = report.strategy.translate(HTML_TEXT_TABLE)
+                                    cross_html = report.cross_platform.translate(HTML_TEXT_TABLE)
+                                    sensitivity_html = report.sensitivity.translate(HTML_TEXT_TABLE)
+                                    parts = [
+                                        existing_content,
+                                        "<hr/><h3>Test Analysis Report</h3>",
+                                        f"<h4>Test Strategy</h4><p>{strategy_html}</p>",
+                                        f"<h4>Cross-Platform Testing</h4><p>{cross_html}</p>",
+                                        f"<h4>Sensitivity Analysis</h4><p>{sensitivity_html}</p>"
+                                    ]
                                     
-                                    if st.session_state.ai_response:
-                                        test_content += f"<h4>AI Q&A</h4><p><strong>Question:</strong> {user_question}</p>"
-                                        test_content += f"<p><strong>Answer:</strong> {st.session_state.ai_response.replace(chr(10), '<br>')}</p>"
+                                    if report.chat_answer:
+                                        answer_html = report.chat_answer.translate(HTML_TEXT_TABLE)
+                                        parts.append(f"<h4>AI Q&amp;A</h4><p><strong>Question:</strong> {user_question.translate(HTML_TEXT_TABLE)}</p>")
+                                        parts.append(f"<p><strong>Answer:</strong> {answer_html}</p>")
                                     
-                                    updated_body = existing_content + test_content
+                                    updated_body = "".join(parts)
                                     
                                     confluence.update_page(
                                         page_id=page_id,
@@ -1346,6 +1653,7 @@ def feature_5():
                                         body=updated_body,
                                         representation="storage"
                                     )
+                                    fetch_space_pages.clear()
                                     st.success("✅ Test analysis saved to Confluence page.")
                             except Exception as e:
                                 st.error(f"❌ Failed to update page: {str(e)}")
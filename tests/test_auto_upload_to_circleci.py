@@ -0,0 +1,26 @@
+"""
+Classifier checks for auto_upload_to_circleci.classify_file
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from auto_upload_to_circleci import classify_file
+
+
+@pytest.mark.parametrize('source, expected', [
+    (b'def test_add():\n    assert 1 + 1 == 2\n', 'test'),
+    (b'async def test_fetch():\n    assert True\n', 'test'),
+    (b'class TestApi:\n    async  def test_get(self):\n        pass\n', 'test'),
+    (b'import pytest\n', 'test'),
+    (b'def add(a, b):\n    return a + b\n', 'code'),
+    (b'', 'skip'),
+])
+def test_classify_file(tmp_path, source, expected):
+    path = tmp_path / 'module.py'
+    path.write_bytes(source)
+    assert classify_file(str(path)) == expected
@@ -4,20 +4,63 @@ Trigger CircleCI with file content and filenames as parameters
 """
 
 import requests
+import argparse
 import base64
+import gzip
 import os
+import sys
 import json
+import logging
+import logging.handlers
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+def configure_logging():
+    """
+    Buffer log records in memory; they are written out on errors or when flushed
+    """
+    log_buffer = logging.handlers.MemoryHandler(
+        capacity=256,
+        flushLevel=logging.ERROR,
+        target=logging.StreamHandler(sys.stdout)
+    )
+    logging.basicConfig(level=logging.INFO, format='%(message)s', handlers=[log_buffer])
+    return log_buffer
+
+@lru_cache(maxsize=1)
+def get_http_session():
+    """
+    Shared keep-alive session so repeated triggers reuse the open connection
+    """
+    # Only connect failures are retried: the POST never reached CircleCI then, whereas a
+    # retried read timeout or 5xx could start a duplicate pipeline
+    retry = Retry(total=3, connect=3, read=0, status=0, backoff_factor=0.5)
+    session = requests.Session()
+    session.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=retry))
+    return session
+
+@lru_cache(maxsize=32)
+def encode_content(content):
+    """
+    Gzip-compressed, base64-encoded UTF-8 content ("gzip+b64"), memoized so re-triggering
+    with the same file skips the re-encode; the pipeline reverses it with base64 -d | gunzip
+    """
+    return base64.b64encode(gzip.compress(content.encode(), compresslevel=6)).decode()
 
 def trigger_circleci_with_files(code_content, test_content, code_filename, test_filename, circleci_token, project_slug):
     """
     Trigger CircleCI pipeline with file content and filenames as parameters
     """
     try:
-        print("🚀 Triggering CircleCI with file content...")
+        logger.info("🚀 Triggering CircleCI with file content...")
         
-        # Encode file content as base64
-        code_content_b64 = base64.b64encode(code_content.encode()).decode()
-        test_content_b64 = base64.b64encode(test_content.encode()).decode()
+        # Compress and base64-encode the file content; source text typically shrinks several times
+        code_content_b64 = encode_content(code_content)
+        test_content_b64 = encode_content(test_content)
         
         # Trigger CircleCI pipeline with parameters
         trigger_url = f"https://circleci.com/api/v2/project/{project_slug}/pipeline"
@@ -32,45 +75,70 @@ def trigger_circleci_with_files(code_content, test_content, code_filename, test_
                 'code_content': code_content_b64,
                 'test_content': test_content_b64,
                 'code_filename': code_filename,
-                'test_filename': test_filename
+                'test_filename': test_filename,
+                'content_encoding': 'gzip+b64'
             }
         }
         
-        response = requests.post(trigger_url, headers=headers, json=payload)
+        # A short connect timeout caps the wait on an unreachable host; reads may take longer
+        response = get_http_session().post(trigger_url, headers=headers, json=payload, timeout=(5, 30))
         
         if response.status_code == 201:
             pipeline_data = response.json()
             pipeline_id = pipeline_data['id']
-            print(f"✅ Pipeline triggered successfully!")
-            print(f"🔗 View pipeline: https://app.circleci.com/pipelines/{project_slug}/{pipeline_id}")
+            logger.info("✅ Pipeline triggered successfully!")
+            logger.info("🔗 View pipeline: https://app.circleci.com/pipelines/%s/%s", project_slug, pipeline_id)
             return {
                 'success': True,
                 'pipeline_id': pipeline_id,
                 'dashboard_url': f"https://app.circleci.com/pipelines/{project_slug}/{pipeline_id}"
             }
         else:
-            print(f"❌ Failed to trigger pipeline: {response.status_code}")
-            print(f"Response: {response.text}")
+            logger.error("❌ Failed to trigger pipeline: %s", response.status_code)
+            logger.info("Response: %s", response.text)
             return {
                 'success': False,
                 'error': f"HTTP {response.status_code}: {response.text}"
             }
             
-    except Exception as e:
-        print(f"❌ Error triggering CircleCI: {e}")
+    except requests.RequestException as e:
+        logger.error("❌ Error triggering CircleCI: %s", e)
         return {
             'success': False,
             'error': str(e)
         }
 
-def main():
+def trigger_many(jobs, max_workers=8):
+    """
+    Trigger one pipeline per job (a dict of trigger_circleci_with_files arguments) concurrently;
+    results come back in job order
+    """
+    # Build the shared session up front so the workers don't race to create it;
+    # max_workers matches its connection pool and bounds the request rate
+    get_http_session()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(lambda job: trigger_circleci_with_files(**job), jobs))
+
+def parse_args(argv=None):
     """
-    Example usage of the CircleCI trigger function with actual code and test content
+    Optional files to upload; without them the built-in example code and tests are sent
     """
-    print("🎯 CircleCI File Upload Trigger")
-    print("=" * 40)
+    parser = argparse.ArgumentParser(description="Trigger CircleCI with file content and filenames as parameters")
+    parser.add_argument('--code-file', help="path of the code file to upload")
+    parser.add_argument('--test-file', help="path of the test file to upload")
+    parser.add_argument('--code-filename', help="name the code file gets in the pipeline (default: basename of --code-file)")
+    parser.add_argument('--test-filename', help="name the test file gets in the pipeline (default: basename of --test-file)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    """
+    Trigger CircleCI with the given code and test files, or with the built-in example
+    """
+    args = parse_args(argv)
+    logger.info("🎯 CircleCI File Upload Trigger")
+    logger.info("=" * 40)
     
-    # Actual code content from user
+    # Example code content, used when no --code-file is given
     code_content = """def add(a, b):
     return a + b
 
@@ -93,7 +161,7 @@ def get_max(numbers):
         raise ValueError("Empty list provided")
     return max(numbers)"""
 
-    # Actual test content from user
+    # Example test content, used when no --test-file is given
     test_content = """import pytest
 from python_sample import add, subtract, divide, multiply, is_even, get_max
 
@@ -126,30 +194,46 @@ def test_get_max():
 def test_fail_example():
     assert add(2, 2) == 5"""
 
+    code_filename = args.code_filename or "python_sample.py"
+    test_filename = args.test_filename or "input_file.py"
+    if args.code_file:
+        with open(args.code_file, encoding='utf-8') as f:
+            code_content = f.read()
+        code_filename = args.code_filename or os.path.basename(args.code_file)
+    if args.test_file:
+        with open(args.test_file, encoding='utf-8') as f:
+            test_content = f.read()
+        test_filename = args.test_filename or os.path.basename(args.test_file)
+
     # Get CircleCI configuration
     token = os.getenv('CIRCLECI_TOKEN')
     project_slug = os.getenv('CIRCLECI_PROJECT_SLUG')
     
     if not token or not project_slug:
-        print("❌ Please set CIRCLECI_TOKEN and CIRCLECI_PROJECT_SLUG environment variables")
+        logger.error("❌ Please set CIRCLECI_TOKEN and CIRCLECI_PROJECT_SLUG environment variables")
         return
     
-    # Trigger CircleCI with actual file names and content
+    # Trigger CircleCI with the chosen file names and content
     result = trigger_circleci_with_files(
         code_content=code_content,
         test_content=test_content,
-        code_filename="python_sample.py",
-        test_filename="input_file.py",
+        code_filename=code_filename,
+        test_filename=test_filename,
         circleci_token=token,
         project_slug=project_slug
     )
     
     if result['success']:
-        print(f"\n🎉 SUCCESS! CircleCI pipeline triggered with actual file content.")
-        print(f"📊 Expected results: 7 test cases (6 passed, 1 failed)")
-        print(f"🔗 Check results at: {result['dashboard_url']}")
+        logger.info("\n🎉 SUCCESS! CircleCI pipeline triggered with actual file content.")
+        if not args.test_file:
+            logger.info("📊 Expected results: 7 test cases (6 passed, 1 failed)")
+        logger.info("🔗 Check results at: %s", result['dashboard_url'])
     else:
-        print(f"\n❌ FAILED: {result['error']}")
+        logger.error("\n❌ FAILED: %s", result['error'])
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    log_buffer = configure_logging()
+    try:
+        main()
+    finally:
+        log_buffer.flush()
\ No newline at end of file